@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import lag  # noqa: E402
+import scoring  # noqa: E402
+
+parser = argparse.ArgumentParser(
+    description='Check that utils/lag.py recovers known lags, off the 10 ms '
+                'frame grid as well, from synthetic reference and estimated '
+                'tracks.')
+parser.add_argument('-n', '--files', type=int, default=10,
+                    help='number of files per lag (default: 10)')
+parser.add_argument('--frames', type=int, default=300,
+                    help='number of reference frames per file '
+                         '(default: 300)')
+parser.add_argument('--lags', type=int, nargs='+',
+                    default=[0, 1, 3, 6, 13, 16, 20, -4, -7],
+                    help='lags to recover in ms (default: %(default)s)')
+parser.add_argument('-t', '--tolerance', type=float, default=0.5,
+                    help='largest error allowed on the lag over all the '
+                         'files, in ms (default: 0.5)')
+args = parser.parse_args()
+
+result_step = 10  # ms, as JSnoori -t 10
+
+
+def contour(duration, rng):
+    # f0 every ms: voiced segments with a smooth contour, unvoiced gaps
+    times = np.arange(duration, dtype=np.float64)
+    values = np.zeros(duration)
+    start = 0
+    while start < duration:
+        start += rng.randint(50, 250)
+        length = rng.randint(100, 400)
+        segment = times[start:start + length]
+        values[start:start + length] = rng.uniform(90, 250) * (
+            1 + 0.1 * np.sin(2 * np.pi * segment / rng.uniform(80, 300) +
+                             rng.uniform(0, 2 * np.pi)))
+        start += length
+    return values
+
+
+def tracks(true_lag, rng):
+    # the estimate at time t - lag is the reference at time t
+    ref_times = scoring.ref_times(args.frames)
+    values = contour(int(ref_times[-1]) + 2 * result_step + 50, rng)
+    result_times = np.arange(0, ref_times[-1] + result_step, result_step)
+    result_times = result_times[result_times + true_lag >= 0]
+    return (values[ref_times], result_times,
+            values[result_times + true_lag])
+
+rng = np.random.RandomState(0)
+failed = False
+print('%6s %10s %22s' % ('lag', 'estimated', 'per file (min, max)'))
+for true_lag in args.lags:
+    curves = []
+    for i in range(args.files):
+        lags, curve = lag.lag_curve(*tracks(true_lag, rng))
+        curves.append(curve)
+    estimated = lag.best_lag(lags, np.sum(curves, axis=0))
+    file_lags = [lag.best_lag(lags, curve) for curve in curves]
+    print('%6d %10.2f %10.2f %10.2f' % (true_lag, estimated, min(file_lags),
+                                         max(file_lags)))
+    failed |= abs(estimated - true_lag) > args.tolerance
+
+if failed:
+    sys.exit("Lags off by more than %.2f ms" % args.tolerance)
+print("Done.")
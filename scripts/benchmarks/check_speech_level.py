@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import mixing  # noqa: E402
+
+# Check mixing.active_speech_level() on signals whose level and activity are
+# known: (name, samples, range of the level in dB, range of the activity)
+
+rate = 16000
+
+times = np.arange(2 * rate) / rate
+sine = 0.5 * np.sin(2 * np.pi * 440 * times)
+sine_db = 10 * np.log10(0.5 ** 2 / 2)
+# active for the first second only, silent after
+half_silent = np.where(times < 1, sine, 0.0)
+# one sample of one bit over silence, below the lowest threshold
+one_bit = np.zeros(rate)
+one_bit[100] = 1 / mixing.full_scale
+one_bit_db = 10 * np.log10(one_bit.dot(one_bit) / len(one_bit))
+# the envelope takes some ms to rise, and some ms to fall under the
+# threshold, after which the hangover keeps the samples active
+hangover = mixing.p56_hangover * rate / len(half_silent)
+half_activity = (0.5 + hangover, 0.5 + hangover + 0.05)
+
+cases = [
+    ('silence', np.zeros(rate), None, (0.0, 0.0)),
+    ('one bit', one_bit, (one_bit_db - 0.01, one_bit_db + 0.01), (0.0, 0.0)),
+    ('sine', sine, (sine_db - 0.1, sine_db + 0.1), (0.98, 1.0)),
+    ('sine / 10', sine / 10, (sine_db - 20.1, sine_db - 19.9), (0.98, 1.0)),
+    # the energy of one second of sine over the active samples
+    ('half silent', half_silent,
+     tuple(sine_db + 10 * np.log10(0.5 / activity)
+           for activity in half_activity[::-1]), half_activity)
+]
+
+failed = False
+print('%-12s %10s %18s %10s %14s' % ('signal', 'level (dB)', 'expected',
+                                     'activity', 'expected'))
+for name, samples, level_range, activity_range in cases:
+    level, activity = mixing.active_speech_level(samples, rate)
+    if level_range is None:
+        print('%-12s %10s %18s' % (name, '-', '-'), end='')
+        failed |= level != 0
+    else:
+        level_db = 10 * np.log10(level)
+        print('%-12s %10.2f %8.2f to %6.2f' % ((name, level_db) +
+                                              level_range), end='')
+        failed |= not level_range[0] <= level_db <= level_range[1]
+    print(' %10.3f %6.3f to %5.3f' % ((activity,) + activity_range))
+    failed |= not activity_range[0] <= activity <= activity_range[1]
+
+if failed:
+    sys.exit("Levels or activities off")
+print("Done.")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import f0_files  # noqa: E402
+import parse_cache  # noqa: E402
+import synthetic_corpus  # noqa: E402
+
+parser = argparse.ArgumentParser(
+    description='Time the .f0/.features parsers (in ms, best of --repeat) '
+                'against pandas.read_csv.')
+parser.add_argument('-n', '--frames', type=int, default=500,
+                    help='number of frames per file (default: 500)')
+parser.add_argument('-r', '--repeat', type=int, default=20,
+                    help='number of parsings to time (default: 20)')
+args = parser.parse_args()
+
+rng = np.random.RandomState(0)
+
+
+# the calls used in error_count() and create_samples() before f0_files.py
+def read_csv_f0(path):
+    return pd.read_csv(
+        path,
+        header=None,
+        index_col=0,
+        names=['f0'],
+        skiprows=11,
+        dtype={0: np.int64, 1: np.float64},
+        sep=r'\s+',
+    )
+
+
+def read_csv_features(path):
+    return pd.read_csv(
+        path,
+        index_col=0,
+        skiprows=14,
+        sep=r'\s+',
+    )
+
+
+def best_time(function, path):
+    return min(timeit.repeat(lambda: function(path), number=1,
+                             repeat=args.repeat))
+
+
+def report(name, baseline, parser, loader, path):
+    baseline_time = best_time(baseline, path)
+    parser_time = best_time(parser, path)
+    loader(path)  # fill the cache
+    loader_time = best_time(loader, path)
+    print('%-18s %10.3f %10.3f %5.1fx %10.3f %5.1fx' %
+          (name, baseline_time * 1000,
+           parser_time * 1000, baseline_time / parser_time,
+           loader_time * 1000, baseline_time / loader_time))
+
+with tempfile.TemporaryDirectory() as tmp_folder:
+    parse_cache.cache_basedir = os.path.join(tmp_folder, 'cache')
+    f0_path = os.path.join(tmp_folder, 'mic_test.yin.f0')
+    features_path = os.path.join(tmp_folder, 'mic_test.yin.features')
+    times = np.arange(args.frames) * 10
+    synthetic_corpus.write_f0_file(f0_path, times,
+                                   rng.uniform(0, 300, args.frames))
+    synthetic_corpus.write_features_file(features_path, times + 16,
+                                         rng.uniform(0, 300, args.frames),
+                                         rng)
+
+    print('Frames per file:', args.frames)
+    print('%-18s %10s %17s %17s' % ('file', 'read_csv', 'parsed', 'cached'))
+    report('.f0', read_csv_f0, f0_files.read_result, f0_files.load_result,
+           f0_path)
+    report('.features', read_csv_features, f0_files.read_features,
+           f0_files.load_features, features_path)
+    report('.features float32', read_csv_features,
+           lambda path: f0_files.read_features(path, np.float32),
+           lambda path: f0_files.load_features(path, np.float32),
+           features_path)
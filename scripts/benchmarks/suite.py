@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'models'))
+import corpus_index  # noqa: E402
+import distortions  # noqa: E402
+import f0_files  # noqa: E402
+import parse_cache  # noqa: E402
+import samples  # noqa: E402
+import scoring  # noqa: E402
+import synthetic_corpus  # noqa: E402
+
+methods = ['martin', 'swipe', 'yin']
+optimal_offsets = {'martin': 16, 'swipe': -4, 'yin': 6}
+max_freq_deviation_percentage = 20
+input_length = 4  # of the LSTM model
+# noise added at these SNRs (dB) by the mixing stage, as
+# add_random_noise_wrt_snr.py
+mixing_snrs = [20, 10, 0]
+mixing_seed = 1000
+
+models_shelf = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            os.pardir, 'models', 'shelf')
+
+parser = argparse.ArgumentParser(
+    description='Time the mixing, scoring and data loading stages on a '
+                'synthetic corpus, and write the results as JSON.')
+parser.add_argument('-n', '--files', type=int, default=50,
+                    help='number of files in the corpus (default: 50)')
+parser.add_argument('--frames', type=int, default=500,
+                    help='number of frames per file (default: 500)')
+parser.add_argument('-r', '--repeat', type=int, default=3,
+                    help='number of runs of each stage, the best one is '
+                         'reported (default: 3)')
+parser.add_argument('-s', '--stage', action='append', dest='stages',
+                    choices=['mixing', 'parse', 'align', 'score',
+                             'create_samples', 'hdf5_write', 'windowing',
+                             'inference'],
+                    help='only run this stage (and the ones it needs), may '
+                         'be repeated')
+parser.add_argument('-o', '--output', default='suite_results.json',
+                    help='results file (default: suite_results.json)')
+parser.add_argument('-c', '--compare', metavar='RESULTS',
+                    help='results file of another version to compare with')
+args = parser.parse_args()
+
+
+# Each stage takes the state left by the previous ones, adds its outputs to it
+# and returns the number of files and frames it processed.
+
+def mixing(state):
+    # every SNR of a speech file from a single read of it, as the distortion
+    # scripts, the speech levels coming from the corpus index
+    outputs = [(os.path.join(state['folder'], 'mixed', str(snr)),
+                ('snr', state['noise_path'], snr, mixing_seed))
+               for snr in mixing_snrs]
+    for folder, condition in outputs:
+        os.makedirs(folder, exist_ok=True)
+    n_frames = 0
+    for wav_path in state['wav_paths']:
+        # without its line per output written
+        with redirect_stdout(io.StringIO()):
+            distortions.fan_out(wav_path, outputs)
+        properties = corpus_index.properties(wav_path)
+        n_frames += len(outputs) * (properties['n_samples'] *
+                                    1000 // properties['rate'] //
+                                    scoring.ref_step)
+    return len(state['wav_paths']) * len(outputs), n_frames
+
+
+def parse(state):
+    refs, folder = state['refs'], state['folder']
+    state['ref_values'], state['results'] = {}, {}
+    n_files = n_frames = 0
+    for ref in refs:
+        ref_values = f0_files.read_ref(os.path.join(folder, 'ref', ref))
+        state['ref_values'][ref] = ref_values
+        n_files += 1
+        n_frames += len(ref_values)
+        for method in methods:
+            result_values = f0_files.read_result(os.path.join(
+                folder, 'results', scoring.result_filename(ref, method)))
+            feature_values = f0_files.read_features(os.path.join(
+                folder, 'features', samples.features_filename(ref, method)))
+            state['results'][(ref, method)] = result_values
+            n_files += 2
+            n_frames += len(result_values) + len(feature_values)
+    return n_files, n_frames
+
+
+def align(state):
+    state['aligned'] = {}
+    n_frames = 0
+    for (ref, method), result_values in state['results'].items():
+        ref_values = state['ref_values'][ref]
+        state['aligned'][(ref, method)] = scoring.align(
+            scoring.ref_times(len(ref_values)),
+            result_values['time'] + optimal_offsets[method],
+            result_values['f0'])
+        n_frames += len(ref_values)
+    return len(state['results']), n_frames
+
+
+def score(state):
+    n_frames = 0
+    for (ref, method), estimated_values in state['aligned'].items():
+        ref_values = state['ref_values'][ref]
+        scoring.score(ref_values, estimated_values,
+                      max_freq_deviation_percentage)
+        scoring.deviation_histogram(ref_values, estimated_values)
+        n_frames += len(ref_values)
+    return len(state['aligned']), n_frames
+
+
+def create_samples(state):
+    refs, folder = state['refs'], state['folder']
+    state['samples'] = {}
+    n_frames = 0
+    for method in methods:
+        data = {}
+        for ref in refs:
+            data['mic' + ref[3:-3]] = samples.create_samples(
+                os.path.join(folder, 'ref', ref),
+                os.path.join(folder, 'features',
+                             samples.features_filename(ref, method)),
+                optimal_offsets[method], max_freq_deviation_percentage)
+            n_frames += len(data['mic' + ref[3:-3]])
+        state['samples'][method] = data
+    return len(refs) * len(methods), n_frames
+
+
+def hdf5_write(state):
+    # as in prepare_data.py, one HDF5 file per method
+    n_frames = 0
+    for method in methods:
+        dataframe = pd.concat(state['samples'][method])
+        dataframe.to_hdf(os.path.join(state['folder'],
+                                      "features_data_" + method + ".h5"),
+                         key='features')
+        n_frames += len(dataframe)
+    return len(methods), n_frames
+
+
+def windowing(state):
+    import speech_data
+    speech_data.hdf5_basedir = state['folder']
+    state['sequences'] = {}
+    n_frames = 0
+    for method in methods:
+        (X_train, y_train), (X_test, y_test) = speech_data.load_sequences(
+            method, sequence_length=input_length)
+        state['sequences'][method] = X_test
+        n_frames += len(X_train) + len(X_test)
+    return len(methods), n_frames
+
+
+def inference(state):
+    from keras.models import model_from_json
+    n_frames = 0
+    for name in ['mlp', 'lstm']:
+        with open(os.path.join(models_shelf,
+                               name + '_model.json')) as json_file:
+            model = model_from_json(json_file.read())
+        for method in methods:
+            model.load_weights(os.path.join(
+                models_shelf, name + '_model_weights-' + method + '.h5'))
+            X = state['sequences'][method]
+            if name == 'mlp':
+                # the frame after each window, as single points
+                X = X[:, -1, :]
+            model.predict(X, batch_size=32)
+            n_frames += len(X)
+    return 2 * len(methods), n_frames
+
+stages = OrderedDict([
+    ('mixing', (mixing, [])),
+    ('parse', (parse, [])),
+    ('align', (align, ['parse'])),
+    ('score', (score, ['align'])),
+    ('create_samples', (create_samples, [])),
+    ('hdf5_write', (hdf5_write, ['create_samples'])),
+    ('windowing', (windowing, ['hdf5_write'])),
+    ('inference', (inference, ['windowing']))
+])
+
+
+def needed_stages(names):
+    needed = set()
+    for name in names:
+        needed.add(name)
+        needed |= needed_stages(stages[name][1])
+    return needed
+
+
+def peak_rss_mb():
+    # peak of the whole process so far, ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+selected = needed_stages(args.stages or stages)
+results = OrderedDict()
+
+with tempfile.TemporaryDirectory() as tmp_folder:
+    # measure parsing every time, as on a first run
+    parse_cache.cache_basedir = None
+    # speech_data.py stores its normalizers under shelf/
+    os.makedirs(os.path.join(tmp_folder, 'shelf'))
+    cwd = os.getcwd()
+    os.chdir(tmp_folder)
+    try:
+        start = time.perf_counter()
+        state = {'folder': tmp_folder,
+                 'refs': synthetic_corpus.write_corpus(
+                     tmp_folder, args.files, args.frames, methods)}
+        if 'mixing' in selected:
+            # indexed once, as the corpora the distortion scripts read
+            state['wav_paths'], state['noise_path'] = (
+                synthetic_corpus.write_wav_corpus(tmp_folder, state['refs']))
+            corpus_index.build(tmp_folder)
+        print("Corpus of %d files written in %.1f s" %
+              (args.files, time.perf_counter() - start))
+
+        for name, (stage, needs) in stages.items():
+            if name not in selected:
+                continue
+            # a stage failing (e.g. pytables or keras missing) is reported
+            # as skipped, with the stages needing it
+            failed = [need for need in needs if 'error' in results[need]]
+            if failed:
+                results[name] = OrderedDict([
+                    ('skipped', True),
+                    ('error', 'needs ' + ', '.join(failed))])
+                continue
+            rss_before = peak_rss_mb()
+            times = []
+            try:
+                for i in range(args.repeat):
+                    start = time.perf_counter()
+                    n_files, n_frames = stage(state)
+                    times.append(time.perf_counter() - start)
+            except Exception as error:
+                print("Skipping", name, "(%s: %s)" % (type(error).__name__,
+                                                      error))
+                results[name] = OrderedDict([
+                    ('skipped', True),
+                    ('error', '%s: %s' % (type(error).__name__, error))])
+                continue
+            seconds = min(times)
+            # the peak RSS is process-wide, only its growth during the stage
+            # is the stage's own
+            results[name] = OrderedDict([
+                ('seconds', seconds),
+                ('files', n_files),
+                ('frames', n_frames),
+                ('files_per_s', n_files / seconds),
+                ('frames_per_s', n_frames / seconds),
+                ('peak_rss_increase_mb', peak_rss_mb() - rss_before)
+            ])
+    finally:
+        os.chdir(cwd)
+
+summary = OrderedDict([
+    ('commit', commit()),
+    ('python', platform.python_version()),
+    ('numpy', np.__version__),
+    ('pandas', pd.__version__),
+    ('parameters', OrderedDict([('files', args.files),
+                                ('frames', args.frames),
+                                ('repeat', args.repeat)])),
+    ('peak_rss_mb', peak_rss_mb()),
+    ('stages', results)
+])
+with open(args.output, 'w') as output_file:
+    json.dump(summary, output_file, indent=1)
+    output_file.write('\n')
+
+previous = {}
+if args.compare:
+    with open(args.compare) as previous_file:
+        previous = json.load(previous_file)['stages']
+
+print('%-15s %10s %12s %12s %10s' %
+      ('stage', 'time (s)', 'files/s', 'frames/s', '+RSS (MB)') +
+      ('   speedup' if args.compare else ''))
+for name, result in results.items():
+    if result.get('skipped'):
+        print('%-15s skipped (%s)' % (name, result['error']))
+        continue
+    line = '%-15s %10.3f %12.1f %12.0f %10.1f' % (
+        name, result['seconds'], result['files_per_s'],
+        result['frames_per_s'], result['peak_rss_increase_mb'])
+    if 'seconds' in previous.get(name, {}):
+        line += '   %6.2fx' % (previous[name]['seconds'] / result['seconds'])
+    print(line)
+print("Peak RSS of the whole run: %.1f MB" % summary['peak_rss_mb'])
+print("Results written to", args.output)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import f0_files  # noqa: E402
+import mixing  # noqa: E402
+import samples  # noqa: E402
+import scoring  # noqa: E402
+
+# number of features per frame, as in the .features files of the extractor
+n_features = 59
+# of the WAV files and of the noise mixed into them
+rate = 16000
+
+
+def f0_track(n_frames, rng):
+    # alternating unvoiced and voiced segments with a smooth contour
+    values = np.zeros(n_frames)
+    start = 0
+    while start < n_frames:
+        start += rng.randint(5, 30)
+        length = rng.randint(10, 60)
+        base = rng.uniform(90, 250)
+        values[start:start + length] = base * (
+            1 + 0.1 * np.sin(np.arange(len(values[start:start + length])) /
+                             rng.uniform(3, 10)))
+        start += length
+    return values
+
+
+def estimated_track(ref_values, rng):
+    # the reference with jitter, octave errors and voicing errors
+    values = ref_values * (1 + 0.02 * rng.randn(len(ref_values)))
+    octave_errors = rng.uniform(size=len(values)) < 0.03
+    values[octave_errors] *= rng.choice([0.5, 2.0], octave_errors.sum())
+    voicing_errors = rng.uniform(size=len(values)) < 0.05
+    values[voicing_errors] = np.where(values[voicing_errors] > 0, 0.0,
+                                      rng.uniform(80, 300,
+                                                  voicing_errors.sum()))
+    return values
+
+
+def write_ref_file(path, ref_values):
+    # f0, voicing, energy and a fourth column, no header
+    with open(path, 'w') as ref_file:
+        for value in ref_values:
+            ref_file.write('%.6f %d 0.0 0.0\n' % (value, value > 0))
+
+
+def write_f0_file(path, times, values):
+    with open(path, 'w') as f0_file:
+        for i in range(f0_files.f0_header_lines):
+            f0_file.write('# header line ' + str(i) + '\n')
+        for time, value in zip(times, values):
+            f0_file.write('%d %.6f\n' % (time, value))
+
+
+def write_features_file(path, times, f0_values, rng):
+    with open(path, 'w') as features_file:
+        for i in range(f0_files.features_header_lines):
+            features_file.write('# header line ' + str(i) + '\n')
+        names = ['time', 'f00_hz'] + ['feature' + str(i)
+                                      for i in range(n_features - 1)]
+        features_file.write(' '.join(names) + '\n')
+        for time, f0_value in zip(times, f0_values):
+            values = rng.uniform(-10, 10, n_features - 1)
+            features_file.write(
+                '%d %.6f ' % (time, f0_value) +
+                ' '.join('%.6f' % value for value in values) + '\n')
+
+
+def write_corpus(folder, n_files, n_frames, methods, seed=0):
+    """Write references, .f0 results and .features files of n_files files
+    of about n_frames frames each, under folder/ref, folder/results and
+    folder/features. Returns the names of the references.
+    """
+    rng = np.random.RandomState(seed)
+    for subfolder in ['ref', 'results', 'features']:
+        os.makedirs(os.path.join(folder, subfolder), exist_ok=True)
+
+    refs = []
+    for i in range(n_files):
+        ref = 'ref_S%04d.f0' % i
+        ref_values = f0_track(n_frames + rng.randint(-n_frames // 10,
+                                                     n_frames // 10 + 1),
+                              rng)
+        write_ref_file(os.path.join(folder, 'ref', ref), ref_values)
+        # estimations every 10 ms from 0 ms, features from 16 ms
+        result_times = np.arange(len(ref_values) + 2) * 10
+        feature_times = scoring.ref_times(len(ref_values))
+        for method in methods:
+            estimated = estimated_track(
+                np.interp(result_times, scoring.ref_times(len(ref_values)),
+                          ref_values, left=0.0, right=0.0),
+                rng)
+            write_f0_file(os.path.join(folder, 'results',
+                                       scoring.result_filename(ref, method)),
+                          result_times, estimated)
+            write_features_file(
+                os.path.join(folder, 'features',
+                             samples.features_filename(ref, method)),
+                feature_times, estimated_track(ref_values, rng), rng)
+        refs.append(ref)
+    return refs
+
+
+def speech_signal(ref_values, rng):
+    # harmonics following the f0 of the reference while voiced, faint noise
+    # otherwise
+    n_samples = int(scoring.ref_times(len(ref_values) + 2)[-1] * rate / 1000)
+    sample_times = np.arange(n_samples) * 1000 / rate
+    f0 = np.interp(sample_times, scoring.ref_times(len(ref_values)),
+                   ref_values, left=0.0, right=0.0)
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    signal = sum(0.3 / k * np.sin(k * phase) for k in range(1, 6))
+    return np.where(f0 > 0, signal, 0.0) + 0.001 * rng.randn(n_samples)
+
+
+def write_wav_corpus(folder, refs, seed=0):
+    """Write a WAV file per reference of write_corpus() in folder, named as
+    in the speech corpus, and a noise file long enough for any of them.
+    Returns the paths of the WAV files and of the noise.
+    """
+    rng = np.random.RandomState(seed)
+    wav_paths = []
+    n_samples = 0
+    for ref in refs:
+        wav_path = os.path.join(folder, 'mic' + ref[3:-3] + '.wav')
+        signal = speech_signal(
+            f0_files.read_ref(os.path.join(folder, 'ref', ref)), rng)
+        mixing.write_wav(wav_path, rate, signal)
+        wav_paths.append(wav_path)
+        n_samples = max(n_samples, len(signal))
+
+    noise_path = os.path.join(folder, 'noise.wav')
+    mixing.write_wav(noise_path, rate,
+                     0.3 * rng.uniform(-1, 1, 2 * n_samples))
+    return wav_paths, noise_path
@@ -1,90 +1,55 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
-import subprocess
+import sys
+from itertools import product
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import distortions  # noqa: E402
+import output_journal  # noqa: E402
+import virtual_corpus  # noqa: E402
 
 snrs = [20, 15, 10, 5, 0, -5]  # dB
 noise_names = ['babble', 'factory1', 'factory2', 'pink', 'white']
 
 input_basedir = "/home/bdeng/datasets/speechdata_16kHz_1_5th"
 noises_folder = "/home/bdeng/datasets/noises_16kHz/"
-fant_path = "/home/bdeng/Documents/fant/filter_add_noise"
 output_dir_prefix = ("/home/bdeng/datasets/" +
                      "speechdata_16kHz_1_5th_with_noise_wrt_snr")
-
-# convert noise files to RAW format
+# seed of the noise segments, as given to FaNT (-r)
+seed = 1000
+
+parser = argparse.ArgumentParser(
+    description='Add noises to the corpus at given SNRs.')
+parser.add_argument('--virtual', action='store_true',
+                    help='only describe the distorted files in the manifest '
+                         'of the corpus, to be synthesized when read')
+output_journal.add_arguments(parser)
+args = parser.parse_args()
+if args.virtual and args.shard:
+    # the manifest describes the whole corpus
+    parser.error('--virtual makes the whole manifest, not one shard of it')
+
+# the files of a subset of a corpus are read from the corpus
+wav_paths = [virtual_corpus.actual_path(path, recipe)
+             for path, recipe in virtual_corpus.wav_files(input_basedir)
+             if os.path.basename(path).startswith('mic')]
+
+# speech level by ITU-T P.56 and unweighted noise level, as FaNT
+# filter_add_noise -u -d; every mix of a file is made from a single read of it
+outputs = [(os.path.join(output_dir_prefix + '_' + noise_name, str(snr)),
+            ('snr', os.path.join(noises_folder, noise_name + '.wav'), snr,
+             seed))
+           for noise_name, snr in product(noise_names, snrs)]
+recipes = distortions.generate(wav_paths, outputs, args.virtual, args.jobs,
+                               args.shard, args.verify)
+# one corpus per noise
 for noise_name in noise_names:
-    subprocess.run(
-        ['sox',
-         os.path.join(noises_folder, noise_name + '.wav'),
-         os.path.join(noises_folder, noise_name + '.raw')]
-    )
-
-# construct in_list
-input_raw_basedir = input_basedir + '_raw'
-os.makedirs(input_raw_basedir, exist_ok=True)
-
-wav_filenames = []
-
-for root, dirs, files in os.walk(input_basedir):
-    for name in files:
-        if name.startswith('mic'):
-            wav_filenames.append(name)
-
-raw_filenames = [os.path.splitext(wav_filename)[0] + '.raw'
-                 for wav_filename in wav_filenames]
-
-for wav_filename, raw_filename in zip(wav_filenames, raw_filenames):
-    subprocess.run(
-        ['sox',
-         os.path.join(input_basedir, wav_filename),
-         os.path.join(input_raw_basedir, raw_filename)]
-    )
-
-with open(os.path.join('shelf', 'in.list'), 'w') as in_list:
-    in_paths = [os.path.join(input_raw_basedir, raw_filename) + '\n'
-                for raw_filename in raw_filenames]
-    in_list.writelines(in_paths)
-
-
-def add_noise_wrt_snr(noise_name):
-    noise_file = os.path.join(noises_folder, noise_name + '.raw')
     output_basedir = output_dir_prefix + '_' + noise_name
-    output_raw_basedir = output_basedir + '_raw'
-
-    for snr in snrs:
-        os.makedirs(os.path.join(output_basedir, str(snr)), exist_ok=True)
-        os.makedirs(os.path.join(output_raw_basedir, str(snr)), exist_ok=True)
-
-    for snr in snrs:
-        with open(os.path.join('shelf', 'out_' + str(snr) + 'dB.list'),
-                  'w') as out_list:
-            out_paths = [os.path.join(output_raw_basedir, str(snr),
-                                      raw_filename) + '\n'
-                         for raw_filename in raw_filenames]
-            out_list.writelines(out_paths)
-
-    for snr in snrs:
-        subprocess.run(
-            [fant_path,
-             '-i', os.path.join('shelf', 'in.list'),
-             '-o', os.path.join('shelf', 'out_' + str(snr) + 'dB.list'),
-             '-n', noise_file,
-             '-u', '-d',
-             '-s', str(snr),
-             '-r', '1000']
-        )
-
-    for snr in snrs:
-        for wav_filename, raw_filename in zip(wav_filenames, raw_filenames):
-            subprocess.run(
-                ['sox', '-r', '16k', '-e', 'signed', '-b', '16', '-c', '1',
-                 os.path.join(output_raw_basedir, str(snr), raw_filename),
-                 os.path.join(output_basedir, str(snr), wav_filename)]
-            )
-
-# add noises
-for noise_name in noise_names:
-    add_noise_wrt_snr(noise_name)
+    virtual_corpus.write_manifest(output_basedir, {
+        dst: recipe for dst, recipe in recipes.items()
+        if dst.startswith(output_basedir + os.sep)})
 
 print("Done.")
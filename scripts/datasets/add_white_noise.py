@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
-import subprocess
-from itertools import product
-from multiprocessing import Pool
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import distortions  # noqa: E402
+import output_journal  # noqa: E402
+import virtual_corpus  # noqa: E402
 
 input_basedir = "/home/bdeng/datasets/speechdata_16kHz_1_5th"
 output_basedir = "/home/bdeng/datasets/speechdata_16kHz_1_5th_with_white_noise"
@@ -11,51 +16,28 @@ output_basedir = "/home/bdeng/datasets/speechdata_16kHz_1_5th_with_white_noise"
 # signal + noise_lambda * noise
 noise_lambdas = [0.0125, 0.025, 0.05, 0.1, 0.2, 0.4, 0.8]
 
-
-def add_white_noise(src, noise_lambda):
-    dst = os.path.join(output_basedir, str(noise_lambda),
-                       os.path.basename(src))
-    print("Generating", dst)
-    vol_adjustment_signal = subprocess.run(
-        ["sox", src, "-n", "stat", "-v"],
-        stderr=subprocess.PIPE, universal_newlines=True
-    ).stderr
-    vol_adjustment_noise = subprocess.run(
-        "sox " + src + " -p synth whitenoise | sox - -n stat -v",
-        stderr=subprocess.PIPE, universal_newlines=True, shell=True
-    ).stderr
-
-    max_amp_signal = 1 / float(vol_adjustment_signal[:-1])
-    max_amp_noise = 1 / float(vol_adjustment_noise[:-1])
-    max_amp_sum = max_amp_signal + noise_lambda * max_amp_noise
-
-    if max_amp_sum < 1:
-        subprocess.run(
-            "sox " + src + " -p synth whitenoise vol " + str(noise_lambda) +
-            " | sox -m " + src + " - " + dst,
-            shell=True)
-    else:
-        # avoid clipping
-        alpha = 1 / max_amp_sum
-        subprocess.run(
-            "sox -m " +
-            "<( sox " + src + " -p vol " + str(alpha) + " ) " +
-            "<( sox " + src + " -p synth whitenoise vol " +
-            str(noise_lambda * alpha) + " ) " + "-b 16 " +
-            dst,
-            shell=True, executable="/bin/bash")
-
-wav_paths = []
-
-for root, dirs, files in os.walk(input_basedir):
-    for name in files:
-        if name.startswith('mic'):
-            wav_paths.append(os.path.join(root, name))
-
-for noise_lambda in noise_lambdas:
-    os.makedirs(os.path.join(output_basedir, str(noise_lambda)))
-
-pool = Pool()
-pool.starmap(add_white_noise, product(wav_paths, noise_lambdas))
+parser = argparse.ArgumentParser(
+    description='Add white noise to the corpus, scaled by lambdas.')
+parser.add_argument('--virtual', action='store_true',
+                    help='only describe the distorted files in the manifest '
+                         'of the corpus, to be synthesized when read')
+output_journal.add_arguments(parser)
+args = parser.parse_args()
+if args.virtual and args.shard:
+    # the manifest describes the whole corpus
+    parser.error('--virtual makes the whole manifest, not one shard of it')
+
+# the files of a subset of a corpus are read from the corpus
+wav_paths = [virtual_corpus.actual_path(path, recipe)
+             for path, recipe in virtual_corpus.wav_files(input_basedir)
+             if os.path.basename(path).startswith('mic')]
+
+# every mix of a file is made from a single read of it
+outputs = [(os.path.join(output_basedir, str(noise_lambda)),
+            ('white_noise', noise_lambda))
+           for noise_lambda in noise_lambdas]
+recipes = distortions.generate(wav_paths, outputs, args.virtual, args.jobs,
+                               args.shard, args.verify)
+virtual_corpus.write_manifest(output_basedir, recipes)
 
 print("Done.")
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import mixing  # noqa: E402
+import virtual_corpus  # noqa: E402
+
+parser = argparse.ArgumentParser(
+    description='Measure the SNR of noisy corpora (one subfolder per SNR in '
+                'dB, e.g. the outputs of FaNT and of '
+                'add_random_noise_wrt_snr.py, virtual or not) against the '
+                'clean speech.')
+parser.add_argument('clean', help='folder of the clean WAV files')
+parser.add_argument('noisy', nargs='+',
+                    help='folders of the noisy corpora to compare')
+parser.add_argument('-t', '--tolerance', type=float, default=0.5,
+                    help='largest accepted difference between the corpora, '
+                         'in dB (default: 0.5)')
+args = parser.parse_args()
+
+
+def measured_snr(clean_path, noisy_path, recipe):
+    # P.56 speech level over the power of what was added to the speech
+    rate, speech = mixing.read_wav(clean_path)
+    with virtual_corpus.opened(noisy_path, recipe) as actual_path:
+        noise = mixing.read_wav(actual_path)[1] - speech
+    speech_level = mixing.active_speech_level(speech, rate)[0]
+    return 10 * np.log10(speech_level / np.mean(noise ** 2))
+
+
+def snr_files(folder):
+    # {SNR: {file name: (path, recipe)}}
+    files = {}
+    for path, recipe in virtual_corpus.wav_files(folder):
+        snr = os.path.basename(os.path.dirname(path))
+        files.setdefault(snr, {})[os.path.basename(path)] = (path, recipe)
+    return files
+
+corpora = [snr_files(folder) for folder in args.noisy]
+snrs = sorted(corpora[0], key=float, reverse=True)
+for folder, files in zip(args.noisy[1:], corpora[1:]):
+    if sorted(files, key=float, reverse=True) != snrs:
+        sys.exit(folder + ": SNRs differ from the ones of " + args.noisy[0])
+
+failed = False
+with Pool() as pool:
+    for snr in snrs:
+        filenames = sorted(corpora[0][snr])
+        measured = []
+        for files in corpora:
+            measured.append(np.array(pool.starmap(measured_snr, [
+                (os.path.join(args.clean, filename),) + files[snr][filename]
+                for filename in filenames])))
+        print("SNR %s dB:" % snr)
+        for folder, values in zip(args.noisy, measured):
+            print("  %-60s mean %6.2f dB, std %.2f dB" %
+                  (folder, values.mean(), values.std()))
+        for folder, values in zip(args.noisy[1:], measured[1:]):
+            # per file, as the noise segments are drawn differently
+            difference = np.abs(values - measured[0])
+            print("  %-60s %.2f dB at most from the first" %
+                  (folder, difference.max()))
+            failed |= difference.max() > args.tolerance
+
+if failed:
+    sys.exit("Differences above %.2f dB" % args.tolerance)
+print("Done.")
@@ -1,20 +1,42 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
 import shutil
-import subprocess
+import sys
+import time
 from multiprocessing import Pool
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import instrument  # noqa: E402
+import output_journal  # noqa: E402
+import resampling  # noqa: E402
+
 dataset_basedir = "/home/bdeng/datasets/SPEECH DATA"
 output_basedir = "/home/bdeng/datasets/speechdata_16kHz"
 refs_folder = os.path.join(output_basedir, "ref")
-os.makedirs(refs_folder)
+output_rate = 16000
+
+parser = argparse.ArgumentParser(
+    description='Resample the corpus to 16 kHz into a single folder, the '
+                'references in its ref/ sub-folder.')
+output_journal.add_arguments(parser)
+args = parser.parse_args()
+
+os.makedirs(refs_folder, exist_ok=True)
 
 
-def resample(src):
+def resample(src, entry):
+    # journal entry of the output, None if the one given is still valid
     dst = os.path.join(output_basedir, os.path.basename(src))
+    params = {'rate': output_rate}
+    source = output_journal.source_entry(src, entry)
+    if output_journal.is_valid(entry, dst, params, source, args.verify):
+        return None
     print("Generating", dst)
-    subprocess.check_call(["sox", src, "-r", "16000", dst])
+    duration = resampling.resample_file(src, dst, output_rate)
+    return output_journal.output_entry(dst, params, source, duration=duration)
 
 wav_paths, ref_paths = [], []
 
@@ -30,7 +52,21 @@ for src in ref_paths:
     print("Generating", dst)
     shutil.copyfile(src, dst)
 
-pool = Pool()
-pool.map(resample, wav_paths)
+journal = output_journal.load(output_basedir)
+tasks = [(wav_path, journal.get(os.path.basename(wav_path)))
+         for wav_path in wav_paths
+         if output_journal.in_shard(wav_path, args.shard)]
+durations = []
+monitor = instrument.Monitor(n_workers=args.jobs)
+with Pool(args.jobs) as pool, monitor:
+    for entry in monitor.imap_unordered(pool, resample, tasks):
+        if entry is not None:
+            output_journal.append(output_basedir, [entry], args.shard)
+            durations.append(entry['duration'])
+    print(len(durations), "files resampled,", len(tasks) - len(durations),
+          "already done")
+    print("%.1f h of audio resampled at %.0f times real time" %
+          (sum(durations) / 3600,
+           sum(durations) / (time.time() - monitor.start)))
 
 print("Done.")
@@ -1,32 +1,34 @@
 #!/usr/bin/env python3
 
-import math
+import argparse
 import os
-import random
-import shutil
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import corpus_subset  # noqa: E402
 
 size_ratio = 0.2  # 20%
+seed = 0
 
 input_basedir = "/home/bdeng/datasets/speechdata_16kHz"
 output_basedir = "/home/bdeng/datasets/speechdata_16kHz_1_5th"
-input_refs_folder = os.path.join(input_basedir, 'ref')
-output_refs_folder = os.path.join(output_basedir, 'ref')
-
-os.makedirs(output_refs_folder)
-
-refs = os.listdir(input_refs_folder)
-picked_refs = random.sample(refs, math.floor(len(refs) * size_ratio))
-
-for ref in picked_refs:
-    ref_src = os.path.join(input_refs_folder, ref)
-    ref_dst = os.path.join(output_refs_folder, ref)
-    print("Generating", ref_dst)
-    shutil.copyfile(ref_src, ref_dst)
 
-    mic_filename = 'mic' + ref[3:-3] + '.wav'
-    mic_src = os.path.join(input_basedir, mic_filename)
-    mic_dst = os.path.join(output_basedir, mic_filename)
-    print("Generating", mic_dst)
-    shutil.copyfile(mic_src, mic_dst)
+parser = argparse.ArgumentParser(
+    description='Define a smaller dataset as a subset of the corpus, listed '
+                'in a manifest instead of copied.')
+parser.add_argument('-r', '--ratio', type=float, default=size_ratio,
+                    help='share of the files picked (default: %(default)s)')
+parser.add_argument('-s', '--seed', type=int, default=seed,
+                    help='seed of the selection (default: %(default)s)')
+parser.add_argument('--stratify', nargs='+', default=[],
+                    choices=['speaker', 'voicing'],
+                    help='pick the same share of the files of every speaker '
+                         'and/or quartile of the ratio of voiced frames')
+args = parser.parse_args()
+
+picked = corpus_subset.make(input_basedir, output_basedir, args.ratio,
+                            args.seed, args.stratify)
+print(len(picked), "files picked into", output_basedir)
 
 print("Done.")
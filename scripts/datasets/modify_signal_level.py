@@ -1,9 +1,14 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
-import subprocess
-from itertools import product
-from multiprocessing import Pool
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import distortions  # noqa: E402
+import output_journal  # noqa: E402
+import virtual_corpus  # noqa: E402
 
 input_basedir = "/home/bdeng/datasets/speechdata_16kHz"
 output_basedir = "/home/bdeng/datasets/speechdata_16kHz_level_modified"
@@ -13,23 +18,27 @@ vols = [0.5, 0.25, 0.125,
         0.0078125, 0.00390625, 0.001953125,
         0.0009765625, 0.00048828125]
 
-
-def modify_level(src, vol):
-    dst = os.path.join(output_basedir, str(vol), os.path.basename(src))
-    print("Generating", dst)
-    subprocess.check_call(["sox", src, dst, "vol", str(vol)])
-
-for vol in vols:
-    os.makedirs(os.path.join(output_basedir, str(vol)))
-
-wav_paths = []
-
-for root, dirs, files in os.walk(input_basedir):
-    for name in files:
-        if name.startswith('mic'):
-            wav_paths.append(os.path.join(root, name))
-
-pool = Pool()
-pool.starmap(modify_level, product(wav_paths, vols))
+parser = argparse.ArgumentParser(
+    description='Modify the signal level of the corpus.')
+parser.add_argument('--virtual', action='store_true',
+                    help='only describe the distorted files in the manifest '
+                         'of the corpus, to be synthesized when read')
+output_journal.add_arguments(parser)
+args = parser.parse_args()
+if args.virtual and args.shard:
+    # the manifest describes the whole corpus
+    parser.error('--virtual makes the whole manifest, not one shard of it')
+
+# the files of a subset of a corpus are read from the corpus
+wav_paths = [virtual_corpus.actual_path(path, recipe)
+             for path, recipe in virtual_corpus.wav_files(input_basedir)
+             if os.path.basename(path).startswith('mic')]
+
+# as "sox SRC DST vol VOL", every volume from a single read of the file
+outputs = [(os.path.join(output_basedir, str(vol)), ('level', vol))
+           for vol in vols]
+recipes = distortions.generate(wav_paths, outputs, args.virtual, args.jobs,
+                               args.shard, args.verify)
+virtual_corpus.write_manifest(output_basedir, recipes)
 
 print("Done.")
@@ -1,19 +1,55 @@
 #!/usr/bin/env python3
 
+import argparse
 import os
-import subprocess
+import sys
+import time
+from multiprocessing import Pool
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import instrument  # noqa: E402
+import output_journal  # noqa: E402
+import resampling  # noqa: E402
 
 input_basedir = "/home/bdeng/datasets/noises"
 output_basedir = "/home/bdeng/datasets/noises_16kHz"
-os.makedirs(output_basedir)
+output_rate = 16000
+
+parser = argparse.ArgumentParser(description='Resample the noises to 16 kHz.')
+output_journal.add_arguments(parser)
+args = parser.parse_args()
+
+os.makedirs(output_basedir, exist_ok=True)
 
 
-def resample(src):
+def resample(src, entry):
+    # noise recordings last minutes, they are resampled by blocks; returns
+    # the journal entry of the output, None if the one given is still valid
     dst = os.path.join(output_basedir, os.path.basename(src))
+    params = {'rate': output_rate}
+    source = output_journal.source_entry(src, entry)
+    if output_journal.is_valid(entry, dst, params, source, args.verify):
+        return None
     print("Generating", dst)
-    subprocess.check_call(["sox", src, "-r", "16000", dst])
+    duration = resampling.resample_file(src, dst, output_rate)
+    return output_journal.output_entry(dst, params, source, duration=duration)
 
-for file in os.listdir(input_basedir):
-    resample(os.path.join(input_basedir, file))
+journal = output_journal.load(output_basedir)
+tasks = [(os.path.join(input_basedir, file), journal.get(file))
+         for file in os.listdir(input_basedir)
+         if output_journal.in_shard(file, args.shard)]
+durations = []
+monitor = instrument.Monitor(n_workers=args.jobs)
+with Pool(args.jobs) as pool, monitor:
+    for entry in monitor.imap_unordered(pool, resample, tasks):
+        if entry is not None:
+            output_journal.append(output_basedir, [entry], args.shard)
+            durations.append(entry['duration'])
+    print(len(durations), "files resampled,", len(tasks) - len(durations),
+          "already done")
+    print("%.1f h of audio resampled at %.0f times real time" %
+          (sum(durations) / 3600,
+           sum(durations) / (time.time() - monitor.start)))
 
 print("Done.")
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import gallery  # noqa: E402
+
+parser = argparse.ArgumentParser(
+    description='Render the figures of the gallery from the data stored by '
+                'the other scripts, skipping the ones up to date.')
+parser.add_argument('--offsets-run', action='append', dest='offsets_runs',
+                    metavar='TIMESTAMP',
+                    help='results run whose offsets figures are rendered '
+                         '(default: ' + gallery.offsets_run + ')')
+parser.add_argument('-f', '--force', action='store_true',
+                    help='render every figure again')
+parser.add_argument('-j', '--jobs', type=int,
+                    help='number of processes (default: one per CPU)')
+args = parser.parse_args()
+
+n_rendered = gallery.build(
+    offsets_runs=args.offsets_runs or [gallery.offsets_run],
+    force=args.force, processes=args.jobs)
+
+print(n_rendered, "figures rendered.")
+print("Done.")
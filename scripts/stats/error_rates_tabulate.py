@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 
 import os
-import shelve
+import sys
 from collections import OrderedDict
 from itertools import product
 
 from tabulate import tabulate
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import warehouse  # noqa: E402
+
+max_freq_deviation_percentage = 20
+
 methods = ['martin', 'swipe', 'yin']
 noise_names = ['babble', 'factory1', 'factory2', 'pink', 'white']
 
@@ -18,27 +24,43 @@ levels = [0.00048828125, 0.0009765625,
 
 snrs = [20, 15, 10, 5, 0, -5]  # dB
 
-with shelve.open(os.path.join('shelf', 'data.for_signal_level.shelve')) as db:
-    error_stats_level = db['error_stats']
+# corpora of the runs: levels of the full corpus, noises added to the 1/5
+# subset
+full_corpus = "/home/bdeng/datasets/speechdata_16kHz"
+subset_corpus = "/home/bdeng/datasets/speechdata_16kHz_1_5th"
+
+
+def level_settings(level):
+    # level 1 is the original audio
+    return {} if level == 1 else {'level': level}
 
 table_for_level = OrderedDict()
 table_for_level['signal level'] = levels
 for method in methods:
-    table_for_level[method] = error_stats_level[method]
+    table_for_level[method] = [
+        warehouse.error_rate(max_freq_deviation_percentage,
+                             corpus=full_corpus, method=method,
+                             settings=level_settings(level))
+        for level in levels]
 
 print("Error rates under different signal levels.")
 print(tabulate(table_for_level, headers="keys"))
 
-with shelve.open(os.path.join('shelf',
-                              'data.for_random_noise_wrt_snr.shelve')) as db:
-    error_stats_snr = db['error_stats']
+# a single query over the partitions of every noise and SNR
+counts_snr = warehouse.error_counts(['noise', 'method', 'snr'],
+                                    max_freq_deviation_percentage,
+                                    corpus=subset_corpus, noise=noise_names,
+                                    method=methods, snr=snrs)
 
 print()
 
 table_for_snr = OrderedDict()
 table_for_snr['SNR'] = snrs
 for (noise_name, method) in product(noise_names, methods):
-    table_for_snr[(noise_name, method)] = error_stats_snr[noise_name][method]
+    table_for_snr[(noise_name, method)] = [
+        counts_snr[(noise_name, method, snr)]['n_errors'] /
+        counts_snr[(noise_name, method, snr)]['n_values']
+        for snr in snrs]
 
 print("Error rates when random noise at certain SNR is added.")
 print(tabulate(table_for_snr, headers="keys"))
@@ -3,16 +3,21 @@
 import argparse
 import os
 import shelve
-from itertools import repeat
+import sys
 from multiprocessing import Pool
 
-import matplotlib
-import matplotlib.pyplot as plt
-import numpy as np
 import pandas as pd
-from matplotlib.ticker import FuncFormatter
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import f0_files  # noqa: E402
+import gallery  # noqa: E402
+import instrument  # noqa: E402
+import result_store  # noqa: E402
+import scoring  # noqa: E402
 
 max_freq_deviation_percentage = 20
+methods = ['martin', 'swipe', 'yin']
 offsets = range(-40, 41)
 
 parser = argparse.ArgumentParser(
@@ -35,107 +40,72 @@ if verbose:
     os.makedirs(os.path.join('series', timestamp))
 
 
-def error_count(ref, method, offset):
-    # method: martin/swipe/yin
-    ref_values = pd.read_csv(
-        os.path.join(refs_folder, ref),
-        sep=' ',
-        header=None,
-        names=['f0'],
-        dtype={0: np.float64},
-        usecols=[0],
-        squeeze=True,
-    )
-    ref_values.index = ref_values.index * 10 + 16
-
-    result = 'mic' + ref[3:-3] + '.' + method + '.f0'
-    result_values = pd.read_csv(
-        os.path.join(results_folder, result),
-        header=None,
-        index_col=0,
-        names=['f0'],
-        skiprows=11,
-        dtype={0: np.int64, 1: np.float64},
-        delim_whitespace=True,
-        squeeze=True,
-    )
-    result_values.index += offset
-    result_values = result_values.reindex(
-        range(min(ref_values.index[0], result_values.index[0]),
-              max(ref_values.index[-1], result_values.index[-1])+1)
-    )
-    result_values_interpolated = result_values.interpolate(method='nearest')
-    result_values_interpolated.fillna(0.0, inplace=True)
-
-    diff = result_values_interpolated.loc[ref_values.index] - ref_values
-    ref_values_no_zero = ref_values.replace(0.0, 100.0)
-    # the best denominator to filter out false positive voiced values, for
-    # that human voice is always higher than 100 * 20% = 20 Hz
-    deviation = diff.abs() / ref_values_no_zero
-
+def error_counts(ref, methods):
+    # read the reference and the results of every method only once, then
+    # evaluate all offsets in a single pass
+    with instrument.stage('read'):
+        ref_values = f0_files.load_ref(os.path.join(refs_folder, ref))
     n_values = len(ref_values)
-    n_errors = len(deviation[deviation > max_freq_deviation_percentage / 100])
 
-    if verbose:
-        csv_filename = os.path.join(
-            'series', timestamp,
-            result + '.' + str(offset) + '.interpolated.txt')
-        result_values_interpolated.to_csv(csv_filename, sep=' ', header=False)
+    n_errors = {}
+    for method in methods:
+        result = scoring.result_filename(ref, method)
+        with instrument.stage('read'):
+            result_times, result_values = f0_files.load_result(
+                os.path.join(results_folder, result))
+        with instrument.stage('score'):
+            n_errors[method] = scoring.error_counts_for_offsets(
+                ref_values, result_times, result_values, offsets,
+                max_freq_deviation_percentage)
+
+        if verbose:
+            estimated_values = scoring.align_offsets(
+                scoring.ref_times(n_values), result_times, result_values,
+                offsets)
+            for offset, estimated_row in zip(offsets, estimated_values):
+                csv_filename = os.path.join(
+                    'series', timestamp,
+                    result + '.' + str(offset) + '.interpolated.txt')
+                estimated_series = pd.Series(
+                    estimated_row, index=scoring.ref_times(n_values))
+                estimated_series.to_csv(csv_filename, sep=' ', header=False)
     return n_values, n_errors
 
 
-def error_rate(method, offset):
-    pool = Pool()
-    error_counts = pool.starmap(
-        error_count,
-        zip(refs, repeat(method), repeat(offset)))
-    pool.close()
-    n_values_total = sum(error_count_[0] for error_count_ in error_counts)
-    n_errors_total = sum(error_count_[1] for error_count_ in error_counts)
-    return n_errors_total/n_values_total
-
-
-def error_rates(method):
-    results = [error_rate(method, offset) for offset in offsets]
+def error_rates(db):
+    keys = {}
+    for method in methods:
+        keys[method] = result_store.cell_key(
+            result_store.input_fingerprints(refs_folder, refs,
+                                            results_folder, method),
+            metric='error_counts_for_offsets', method=method,
+            offsets=offsets, threshold=max_freq_deviation_percentage)
+
+    pending_methods = [method for method in methods if keys[method] not in db]
+    if pending_methods:
+        with Pool() as pool, instrument.Monitor() as monitor:
+            counts = monitor.starmap(pool, error_counts,
+                                     [(ref, pending_methods) for ref in refs])
+        n_values_total = sum(count[0] for count in counts)
+        for method in pending_methods:
+            n_errors_total = sum(count[1][method] for count in counts)
+            db[keys[method]] = (n_values_total, n_errors_total)
+            db.sync()
+
+    results = {}
+    for method in methods:
+        n_values_total, n_errors_total = db[keys[method]]
+        results[method] = list(n_errors_total / n_values_total)
     return results
 
 os.makedirs('shelf', exist_ok=True)
 
 with shelve.open(os.path.join('shelf', 'data.' + timestamp + '.shelve')) as db:
-    if 'error_stats' in db:
-        error_stats = db['error_stats']
-    else:
-        error_stats = {}
-        for method in ['martin', 'swipe', 'yin']:
-            error_stats[method] = error_rates(method)
-        db['error_stats'] = error_stats
-
-
-plt.title("Error rates under different offsets", fontsize=14,
-          fontweight='bold')
-plt.xlabel("offset (ms)")
-plt.ylabel("F0 estimation error rate")
-
-
-def to_percent(y, position):
-    # Ignore the passed in position. This has the effect of scaling the default
-    # tick locations.
-    s = str(100 * y)
-
-    # The percent symbol needs escaping in latex
-    if matplotlib.rcParams['text.usetex'] is True:
-        return s + r'$\%$'
-    else:
-        return s + '%'
-
-formatter = FuncFormatter(to_percent)
-plt.gca().yaxis.set_major_formatter(formatter)
-
-mic_m, = plt.plot(offsets, error_stats['martin'], 'r-o', label="martin")
-mic_s, = plt.plot(offsets, error_stats['swipe'], 'g-o', label="swipe")
-mic_y, = plt.plot(offsets, error_stats['yin'], 'b-o', label="yin")
-plt.legend(handles=[mic_m, mic_s, mic_y])
-plt.savefig(os.path.join('../../gallery', 'error_rates_vs_offsets.pdf'),
-            papertype='a4')
+    error_stats = error_rates(db)
+    db['error_stats'] = error_stats
+    db['offsets'] = list(offsets)
+
+gallery.build(shelves=['data.' + timestamp + '.shelve'],
+              offsets_runs=[timestamp])
 
 print("Done.")
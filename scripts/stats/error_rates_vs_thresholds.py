@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+import os
+import shelve
+import sys
+from itertools import product
+from multiprocessing import Pool
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import corpus_subset  # noqa: E402
+import gallery  # noqa: E402
+import grid  # noqa: E402
+import instrument  # noqa: E402
+import registry  # noqa: E402
+import result_store  # noqa: E402
+import scoring  # noqa: E402
+
+snrs = [20, 15, 10, 5, 0, -5]  # dB
+# thresholds on the deviation, from 1% to 50%
+max_freq_deviation_percentages = np.arange(10, 501) / 10
+
+# only used for the counts of score(), the curves come from the histograms
+max_freq_deviation_percentage = 20
+methods = ['martin', 'swipe', 'yin']
+optimal_offsets = {'martin': 16, 'swipe': -4, 'yin': 6}
+
+# the corpus scored, that random noise at SNRs was added to
+corpus = "/home/bdeng/datasets/speechdata_16kHz_1_5th"
+# the references picked by the subset, in the original corpus
+refs_folder, refs = corpus_subset.refs(corpus)
+
+
+def results_folder(snr):
+    return registry.run_folder('results', corpus, noise='random', snr=snr)
+
+
+def score(ref, method, snr, offset):
+    # method: martin/swipe/yin
+    result = scoring.result_filename(ref, method)
+    return scoring.score_file(
+        os.path.join(refs_folder, ref),
+        os.path.join(results_folder(snr), result),
+        offset, max_freq_deviation_percentage)
+
+
+def error_rate_curves(db):
+    # same cells as error_rates_vs_snrs.py, which thus share their results
+    cells, keys = {}, {}
+    for method, snr in product(methods, snrs):
+        cell = (method, snr)
+        offset = optimal_offsets[method]
+        cells[cell] = (method, snr, offset)
+        keys[cell] = result_store.cell_key(
+            result_store.input_fingerprints(
+                refs_folder, refs,
+                results_folder(snr), method),
+            metric='score', method=method, snr=snr, offset=offset,
+            threshold=max_freq_deviation_percentage)
+    with Pool() as pool, instrument.Monitor() as monitor:
+        counts = grid.evaluate_grid(pool, score, cells, refs, db, keys,
+                                    monitor=monitor)
+
+    curves = {}
+    for method, snr in product(methods, snrs):
+        cell_counts, histogram = counts[(method, snr)]
+        curves[(method, snr)] = scoring.error_rate_curve(
+            histogram, scoring.totals(cell_counts)['n_values'],
+            max_freq_deviation_percentages)
+    return curves
+
+os.makedirs('shelf', exist_ok=True)
+
+with shelve.open(os.path.join('shelf', 'data.for_snr.shelve')) as db:
+    db['threshold_curves'] = error_rate_curves(db)
+    db['snrs'] = snrs
+    db['max_freq_deviation_percentages'] = \
+        max_freq_deviation_percentages
+
+gallery.build(shelves=['data.for_snr.shelve'])
+
+print("Done.")
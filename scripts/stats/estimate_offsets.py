@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import shelve
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, 'utils'))
+import f0_files  # noqa: E402
+import gallery  # noqa: E402
+import instrument  # noqa: E402
+import lag  # noqa: E402
+import result_store  # noqa: E402
+import scoring  # noqa: E402
+
+methods = ['martin', 'swipe', 'yin']
+max_lag = 40  # ms
+resolution = 1  # ms
+
+parser = argparse.ArgumentParser(
+    description='Estimate the offsets of F0 estimations to the references '
+                'by cross-correlation, per file and per method.')
+parser.add_argument('timestamp',
+                    help='result folder name (a timestamp)')
+args = parser.parse_args()
+timestamp = args.timestamp
+
+refs_folder = "/home/bdeng/datasets/speechdata_16kHz/ref"
+results_folder = os.path.join("/home/bdeng/datasets/results", timestamp)
+
+refs = sorted(os.listdir(refs_folder))
+
+
+def lag_curves(ref, methods):
+    # read the reference only once for all methods
+    with instrument.stage('read'):
+        ref_values = f0_files.load_ref(os.path.join(refs_folder, ref))
+    curves = {}
+    for method in methods:
+        with instrument.stage('read'):
+            result_times, result_values = f0_files.load_result(os.path.join(
+                results_folder, scoring.result_filename(ref, method)))
+        with instrument.stage('lag_curve'):
+            curves[method] = lag.lag_curve(ref_values, result_times,
+                                           result_values, max_lag,
+                                           resolution)[1]
+    return curves
+
+
+def estimate_lags(db):
+    keys = {}
+    for method in methods:
+        keys[method] = result_store.cell_key(
+            result_store.input_fingerprints(refs_folder, refs,
+                                            results_folder, method),
+            metric='lag_curves', method=method, max_lag=max_lag,
+            resolution=resolution, lag_version=lag.lag_version)
+
+    pending_methods = [method for method in methods if keys[method] not in db]
+    if pending_methods:
+        with Pool() as pool, instrument.Monitor() as monitor:
+            curves = monitor.starmap(pool, lag_curves,
+                                     [(ref, pending_methods) for ref in refs])
+        for method in pending_methods:
+            # one row per reference, in the order of refs
+            db[keys[method]] = np.array([curve[method] for curve in curves])
+            db.sync()
+
+    lags = np.arange(-max_lag, max_lag + resolution, resolution)
+    method_lags, file_lags = {}, {}
+    for method in methods:
+        per_file_curves = db[keys[method]]
+        method_lags[method] = lag.best_lag(lags,
+                                           per_file_curves.sum(axis=0))
+        file_lags[method] = np.array([lag.best_lag(lags, curve)
+                                      for curve in per_file_curves])
+    return method_lags, file_lags
+
+os.makedirs('shelf', exist_ok=True)
+
+with shelve.open(os.path.join('shelf', 'data.' + timestamp + '.shelve')) as db:
+    method_lags, file_lags = estimate_lags(db)
+    db['estimated_offsets'] = method_lags
+    db['estimated_file_offsets'] = file_lags
+    db['lags'] = np.arange(-max_lag, max_lag + resolution, resolution)
+
+for method in methods:
+    print("%s: offset %.1f ms over the corpus, per file median %.1f ms, "
+          "5-95%% range %.1f to %.1f ms" %
+          ((method, method_lags[method], np.median(file_lags[method])) +
+           tuple(np.percentile(file_lags[method], [5, 95]))))
+print("optimal_offsets =",
+      {method: int(round(method_lags[method])) for method in methods})
+
+gallery.build(shelves=['data.' + timestamp + '.shelve'],
+              offsets_runs=[timestamp])
+
+print("Done.")
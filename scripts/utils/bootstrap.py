@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+import functools
+
+import numpy as np
+
+import scoring
+
+
+@functools.lru_cache(maxsize=4)
+def resampling_weights(n_files, n_replicates=2000, method='poisson', seed=0):
+    """How many times each file is drawn, one row per bootstrap replicate.
+
+    'multinomial' is the classical bootstrap (n_files draws with replacement);
+    'poisson' approximates it with independent Poisson(1) weights, which is
+    cheaper to draw for large corpora. The weights are drawn once and reused
+    for every cell of a grid, leaving one matrix product per cell.
+    """
+    random_state = np.random.RandomState(seed)
+    if method == 'poisson':
+        weights = random_state.poisson(1.0, (n_replicates, n_files))
+    elif method == 'multinomial':
+        weights = random_state.multinomial(
+            n_files, np.full(n_files, 1.0 / n_files), size=n_replicates)
+    else:
+        raise ValueError('unknown resampling method: ' + method)
+    # shared between calls
+    weights.flags.writeable = False
+    return weights
+
+
+def ratio_interval(numerators, denominators, confidence=0.95,
+                   n_replicates=2000, method='poisson', seed=0):
+    # confidence interval of sum(numerators) / sum(denominators), the terms
+    # being per file, with all the replicates computed as one product
+    weights = resampling_weights(len(numerators), n_replicates, method, seed)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratios = weights.dot(numerators) / weights.dot(denominators)
+    tail = 100 * (1 - confidence) / 2
+    return tuple(np.nanpercentile(ratios, [tail, 100 - tail]))
+
+
+def error_rate_interval(per_file_counts, **kwargs):
+    # per_file_counts: counts of scoring.score(), one row per file
+    per_file_counts = np.asarray(per_file_counts)
+    return ratio_interval(
+        per_file_counts[:, scoring.metric_names.index('n_errors')],
+        per_file_counts[:, scoring.metric_names.index('n_values')],
+        **kwargs)
+
+
+def error_bars(rates, intervals):
+    # intervals as distances below and above the rates, for plt.errorbar()
+    lower = [rate - interval[0] for rate, interval in zip(rates, intervals)]
+    upper = [interval[1] - rate for rate, interval in zip(rates, intervals)]
+    return [lower, upper]
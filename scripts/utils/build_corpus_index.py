@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+
+import argparse
+
+import corpus_index
+
+parser = argparse.ArgumentParser(
+    description='Index the WAV files of corpus folders (duration, peak, RMS, '
+                'active speech level, voiced frames of the references).')
+parser.add_argument('folders', nargs='+', help='corpus folders')
+parser.add_argument('-f', '--force', action='store_true',
+                    help='measure again the files already indexed')
+parser.add_argument('-j', '--processes', type=int,
+                    help='number of worker processes (default: one per CPU)')
+args = parser.parse_args()
+
+for folder in args.folders:
+    print("Indexing", folder)
+    index = corpus_index.build(folder, args.force, args.processes)
+    print(len(index), "files,",
+          "%.1f h" % (sum(entry['duration'] for entry in index.values()) /
+                      3600))
+
+print("Done.")
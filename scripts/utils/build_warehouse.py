@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+from itertools import product
+from multiprocessing import Pool
+
+import registry
+import warehouse
+
+methods = ['martin', 'swipe', 'yin']
+optimal_offsets = {'martin': 16, 'swipe': -4, 'yin': 6}
+
+parser = argparse.ArgumentParser(
+    description='Write the frames of results runs into the warehouse.')
+parser.add_argument('runs', nargs='*',
+                    help='registered results runs (default: all of them)')
+parser.add_argument('--refs',
+                    default="/home/bdeng/datasets/speechdata_16kHz/ref",
+                    help='folder of the references')
+parser.add_argument('-f', '--force', action='store_true',
+                    help='rebuild partitions already in the warehouse, '
+                         'even if their sources did not change')
+args = parser.parse_args()
+
+runs = args.runs or registry.registered_runs('results')
+
+
+def build(run, method):
+    print("Building", run, method)
+    warehouse.build_partition(run, method, args.refs,
+                              optimal_offsets[method])
+
+# partitions missing, or made from other results, references or offsets
+tasks = [(run, method) for run, method in product(runs, methods)
+         if args.force or not warehouse.is_current(
+             run, method, args.refs, optimal_offsets[method])]
+
+os.makedirs(warehouse.warehouse_folder, exist_ok=True)
+with Pool() as pool:
+    pool.starmap(build, tasks)
+warehouse.update_catalog()
+
+print("Done.")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from functools import lru_cache
+from multiprocessing import Pool
+
+import numpy as np
+
+import f0_files
+import mixing
+
+# index of the WAV files of a corpus folder, in that folder; the references
+# are in its ref/ sub-folder
+index_filename = 'index.json'
+
+
+def ref_filename(wav_filename):
+    # mic*.wav -> ref*.f0
+    return 'ref' + wav_filename[3:-4] + '.f0'
+
+
+def measure(path):
+    """Properties of a WAV file: sampling rate, number of samples, duration,
+    maximum amplitude, RMS, active speech level (mean power, ITU-T P.56) and
+    activity factor, and the number of frames and voiced frames of its
+    reference if there is one. The size and modification time of the file
+    tell whether they are outdated.
+    """
+    stat = os.stat(path)
+    rate, samples = mixing.read_wav(path)
+    active_level, activity = mixing.active_speech_level(samples, rate)
+    entry = OrderedDict([
+        ('size', stat.st_size),
+        ('mtime_ns', stat.st_mtime_ns),
+        ('rate', int(rate)),
+        ('n_samples', len(samples)),
+        ('duration', len(samples) / rate),
+        ('max_amplitude', float(mixing.max_amplitude(samples))),
+        ('rms', float(np.sqrt(np.mean(samples ** 2)))
+         if len(samples) else 0.0),
+        ('active_level', float(active_level)),
+        ('activity', float(activity))
+    ])
+
+    folder, name = os.path.split(path)
+    ref_path = os.path.join(folder, 'ref', ref_filename(name))
+    if os.path.isfile(ref_path):
+        ref_values = f0_files.load_ref(ref_path)
+        entry['ref'] = ref_filename(name)
+        entry['n_frames'] = len(ref_values)
+        entry['n_voiced'] = int(np.count_nonzero(ref_values))
+    return entry
+
+
+def is_current(entry, path):
+    stat = os.stat(path)
+    return (entry['size'] == stat.st_size and
+            entry['mtime_ns'] == stat.st_mtime_ns)
+
+
+@lru_cache(maxsize=None)
+def load_index(folder):
+    # {WAV file name: properties}, empty if the folder has no index
+    try:
+        with open(os.path.join(folder, index_filename)) as index_file:
+            return json.load(index_file, object_pairs_hook=OrderedDict)
+    except FileNotFoundError:
+        return {}
+
+
+def properties(path):
+    """Properties of a WAV file, as measure(), from the index of its folder;
+    measured now if the file is not indexed or changed since.
+    """
+    path = os.path.abspath(path)
+    folder, name = os.path.split(path)
+    entry = load_index(folder).get(name)
+    if entry is None or not is_current(entry, path):
+        entry = measure(path)
+    return entry
+
+
+def build(folder, force=False, processes=None):
+    """Index the WAV files of folder in a single parallel pass. Entries of
+    unchanged files are kept, unless force. Returns the index.
+    """
+    folder = os.path.abspath(folder)
+    names = sorted(name for name in os.listdir(folder)
+                   if os.path.splitext(name)[1] == '.wav')
+    index = OrderedDict() if force else OrderedDict(load_index(folder))
+    for name in list(index):
+        if name not in names:
+            del index[name]
+    pending = [name for name in names if name not in index or
+               not is_current(index[name], os.path.join(folder, name))]
+
+    with Pool(processes) as pool:
+        entries = pool.map(measure, [os.path.join(folder, name)
+                                     for name in pending])
+    index.update(zip(pending, entries))
+    index = OrderedDict(sorted(index.items()))
+
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp_file:
+        json.dump(index, tmp_file, indent=1)
+        tmp_file.write('\n')
+    os.replace(tmp_path, os.path.join(folder, index_filename))
+    load_index.cache_clear()
+    return index
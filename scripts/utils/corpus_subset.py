@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+import json
+import math
+import os
+import tempfile
+from collections import OrderedDict, defaultdict
+
+import numpy as np
+
+import corpus_index
+import virtual_corpus
+
+# description of a subset of a corpus, at its root next to the manifest of the
+# virtual corpus listing its WAV files: original corpus folder, parameters of
+# the selection and names of the references picked
+subset_filename = 'subset.json'
+# strata of the ratio of voiced frames, by quantiles
+n_voicing_bins = 4
+
+
+def speaker(wav_filename):
+    # mic_F01_sa1.wav -> F01
+    return wav_filename.split('_')[1]
+
+
+def voicing_bins(folder, names, n_bins=n_voicing_bins):
+    """Quantile bin (0 to n_bins - 1) of the ratio of voiced frames of the
+    reference of every WAV file of folder, by name, from the corpus index.
+    """
+    ratios = []
+    for name in names:
+        entry = corpus_index.properties(os.path.join(folder, name))
+        ratios.append(entry['n_voiced'] / entry['n_frames']
+                      if entry.get('n_frames') else 0.0)
+    edges = np.quantile(ratios, np.arange(1, n_bins) / n_bins)
+    return dict(zip(names,
+                    np.searchsorted(edges, ratios, side='right').tolist()))
+
+
+def pick(names, ratio, seed, strata=None):
+    """Random sample of floor(ratio * len(names)) names, drawn with the given
+    seed, in order.
+
+    strata maps every name to its stratum; every stratum is then sampled in
+    proportion to its size, the largest remainders getting one more name.
+    """
+    if not names:
+        return []
+    n_picked = math.floor(len(names) * ratio)
+    groups = defaultdict(list)
+    for name in sorted(names):
+        groups[strata[name] if strata else None].append(name)
+    keys = sorted(groups, key=str)
+
+    quotas = {key: len(groups[key]) * n_picked / len(names) for key in keys}
+    counts = {key: math.floor(quotas[key]) for key in keys}
+    n_left = n_picked - sum(counts.values())
+    by_remainder = sorted(keys, key=lambda key: counts[key] - quotas[key])
+    for key in by_remainder[:n_left]:
+        counts[key] += 1
+
+    rng = np.random.RandomState(seed)
+    picked = []
+    for key in keys:
+        picked.extend(str(name) for name in rng.choice(
+            groups[key], counts[key], replace=False))
+    return sorted(picked)
+
+
+def make(folder, subset_folder, ratio, seed, stratify=()):
+    """Make subset_folder a subset of the corpus folder: ratio of its WAV
+    files with a reference, drawn with the given seed, stratified by
+    'speaker' and/or 'voicing' (ratio of voiced frames). Nothing is copied:
+    the WAV files are listed in the manifest of a virtual corpus, with their
+    sources unchanged, and the references in the description of the subset.
+    Returns the names of the WAV files picked.
+    """
+    folder = os.path.abspath(folder)
+    subset_folder = os.path.abspath(subset_folder)
+    if os.path.isdir(subset_folder) and any(
+            os.path.splitext(name)[1] == '.wav'
+            for name in os.listdir(subset_folder)):
+        raise ValueError(subset_folder + " already holds WAV files")
+    names = sorted(
+        name for name in os.listdir(folder)
+        if os.path.splitext(name)[1] == '.wav' and os.path.isfile(
+            os.path.join(folder, 'ref', corpus_index.ref_filename(name))))
+
+    strata = None
+    if stratify:
+        bins = voicing_bins(folder, names) if 'voicing' in stratify else {}
+        strata = {name: tuple(speaker(name) if kind == 'speaker'
+                              else bins[name] for kind in stratify)
+                  for name in names}
+    picked = pick(names, ratio, seed, strata)
+
+    virtual_corpus.write_manifest(subset_folder, {
+        os.path.join(subset_folder, name):
+        virtual_corpus.recipe(os.path.join(folder, name))
+        for name in picked})
+    description = OrderedDict([
+        ('corpus', folder), ('ratio', ratio), ('seed', seed),
+        ('stratify', list(stratify)),
+        ('refs', [corpus_index.ref_filename(name) for name in picked])
+    ])
+    fd, tmp_path = tempfile.mkstemp(dir=subset_folder, suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp_file:
+        json.dump(description, tmp_file, indent=1)
+        tmp_file.write('\n')
+    os.replace(tmp_path, os.path.join(subset_folder, subset_filename))
+    return picked
+
+
+def refs(folder):
+    """Folder of the references of a corpus folder, and their names. The
+    references of a subset are those it picked, in the original corpus.
+    """
+    try:
+        with open(os.path.join(folder, subset_filename)) as subset_file:
+            description = json.load(subset_file)
+    except FileNotFoundError:
+        refs_folder = os.path.join(folder, 'ref')
+        return refs_folder, os.listdir(refs_folder)
+    return os.path.join(description['corpus'], 'ref'), description['refs']
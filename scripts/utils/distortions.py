@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+
+import os
+from multiprocessing import Pool
+
+import numpy as np
+
+import corpus_index
+import instrument
+import mixing
+import output_journal
+import virtual_corpus
+
+# Conditions are tuples:
+# ('level', vol): signal * vol, as "sox SRC DST vol VOL"
+# ('noise', noise_path, noise_lambda): signal + noise_lambda * noise, as
+#     mixed by "sox -m" (see mixing.mix_gains())
+# ('white_noise', noise_lambda): the same with white noise
+# ('snr', noise_path, snr, seed): noise added at an SNR in dB, as FaNT
+#     filter_add_noise -u -d with the given seed (see mixing.snr_gain())
+
+
+def condition_recipe(condition, src, src_properties, dst):
+    """Recipe of the variant of src in the given condition, with the noise
+    samples drawn to make it if any (None otherwise). The random segments
+    and noises depend on dst only.
+    """
+    kind = condition[0]
+    n_samples = src_properties['n_samples']
+    if kind == 'level':
+        return virtual_corpus.recipe(src, condition[1]), None
+
+    if kind == 'white_noise':
+        noise_lambda = condition[1]
+        # the same noise is measured and mixed
+        seed = mixing.file_seed(dst)
+        noise = mixing.white_noise(n_samples, np.random.RandomState(seed))
+        signal_gain, noise_gain = mixing.mix_gains(
+            noise_lambda, src_properties['max_amplitude'],
+            mixing.max_amplitude(noise))
+        return virtual_corpus.recipe(src, signal_gain, 'white', seed=seed,
+                                     noise_gain=noise_gain), noise
+
+    noise_path = condition[1]
+    noise_rate, noise, max_amp_noise = mixing.load_noise(noise_path)
+    if noise_rate != src_properties['rate']:
+        raise ValueError(noise_path + ": sampling rate " + str(noise_rate) +
+                         " instead of " + str(src_properties['rate']))
+    if kind == 'noise':
+        noise_lambda = condition[2]
+        signal_gain, noise_gain = mixing.mix_gains(
+            noise_lambda, src_properties['max_amplitude'], max_amp_noise)
+        begin = mixing.segment_begin(len(noise), n_samples,
+                                     mixing.file_rng(dst))
+        return virtual_corpus.recipe(src, signal_gain, noise_path, begin,
+                                     noise_gain=noise_gain), None
+    if kind == 'snr':
+        snr, seed = condition[2:]
+        begin = mixing.segment_begin(len(noise), n_samples,
+                                     mixing.file_rng(seed, dst))
+        segment = mixing.noise_segment(noise, begin, n_samples)
+        noise_gain = mixing.snr_gain(segment, snr,
+                                     src_properties['active_level'])
+        return virtual_corpus.recipe(src, 1.0, noise_path, begin,
+                                     noise_gain=noise_gain), segment
+    raise ValueError("unknown condition " + repr(condition))
+
+
+def fan_out(src, outputs, virtual=False):
+    """Make every distorted variant of src in one pass, and return their
+    recipes by destination path.
+
+    outputs lists (folder, condition) pairs, the variant going to
+    folder/<name of src>. The properties of src come from the corpus index;
+    the file is read once, and only if the variants are written out (not
+    virtual).
+    """
+    src_properties = corpus_index.properties(src)
+    rate = signal = None
+    recipes = {}
+    for folder, condition in outputs:
+        dst = os.path.join(folder, os.path.basename(src))
+        recipes[dst], noise = condition_recipe(condition, src,
+                                               src_properties, dst)
+        if virtual:
+            continue
+        if signal is None:
+            rate, signal = mixing.read_wav(src)
+        print("Generating", dst)
+        samples = virtual_corpus.apply(recipes[dst], signal, noise)
+        if mixing.max_amplitude(samples) >= 1:
+            print("Warning: clipping in", dst)
+        mixing.write_wav(dst, rate, samples)
+    return recipes
+
+
+def _generate_file(src, outputs, entries, verify):
+    # fan_out() to the outputs of src without a valid journal entry; returns
+    # the (folder, entry) pairs of the outputs made
+    source = output_journal.source_entry(
+        src, next((entry for entry in entries if entry), None))
+    name = os.path.basename(src)
+    pending = [(folder, condition)
+               for (folder, condition), entry in zip(outputs, entries)
+               if not output_journal.is_valid(
+                   entry, os.path.join(folder, name), condition, source,
+                   verify)]
+    recipes = fan_out(src, pending)
+    made = []
+    for folder, condition in pending:
+        dst = os.path.join(folder, name)
+        made.append((folder, output_journal.output_entry(
+            dst, condition, source, recipe=recipes[dst])))
+    return made
+
+
+def generate(wav_paths, outputs, virtual=False, processes=None, shard=None,
+             verify=False):
+    """fan_out() every source file on a pool of processes workers, and
+    return the recipes of all variants by destination path.
+
+    Only the source files of the given shard (k, n) are processed; virtual
+    runs reject shards, their recipes making the manifest of the whole
+    corpus. Unless virtual, every output written is recorded in the journal
+    of its folder (see output_journal.py): outputs already recorded, from
+    the same source and condition and unchanged since, are not made again,
+    so that an interrupted run resumes where it stopped. The recipes
+    returned are then those of every output completed in the folders, by any
+    shard.
+    """
+    if virtual and shard is not None:
+        raise ValueError("virtual runs describe the whole corpus, not a "
+                         "shard of it")
+    wav_paths = [wav_path for wav_path in wav_paths
+                 if output_journal.in_shard(wav_path, shard)]
+    # map the noise files once, the workers inherit them
+    for folder, condition in outputs:
+        if condition[0] in ('noise', 'snr'):
+            mixing.load_noise(condition[1])
+
+    recipes = {}
+    if virtual:
+        monitor = instrument.Monitor(n_workers=processes)
+        with Pool(processes) as pool, monitor:
+            for file_recipes in monitor.imap_unordered(
+                    pool, fan_out,
+                    [(wav_path, outputs, True) for wav_path in wav_paths]):
+                recipes.update(file_recipes)
+        return recipes
+
+    journals = {}
+    for folder, condition in outputs:
+        os.makedirs(folder, exist_ok=True)
+        journals[folder] = output_journal.load(folder)
+    tasks = [(wav_path, outputs,
+              [journals[folder].get(os.path.basename(wav_path))
+               for folder, condition in outputs], verify)
+             for wav_path in wav_paths]
+    n_made = 0
+    monitor = instrument.Monitor(n_workers=processes)
+    with Pool(processes) as pool, monitor:
+        for made in monitor.imap_unordered(pool, _generate_file, tasks):
+            for folder, entry in made:
+                output_journal.append(folder, [entry], shard)
+                journals[folder][entry['name']] = entry
+            n_made += len(made)
+    print(n_made, "outputs made,", len(tasks) * len(outputs) - n_made,
+          "already done")
+
+    for folder, condition in outputs:
+        recipes.update(
+            (os.path.join(folder, name), entry['recipe'])
+            for name, entry in journals[folder].items()
+            if entry['params'] == output_journal.plain(condition))
+    return recipes
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+import itertools
+import warnings
+
+import numpy as np
+import pandas as pd
+
+import packed_corpus
+import parse_cache
+
+# JSnoori .f0 files: 11 lines of header, then time (ms) and f0 (Hz) per line
+f0_header_lines = 11
+# .features files: 14 lines of header, a line of column names, then one line
+# of features per frame, the first column being the time (ms)
+features_header_lines = 14
+
+
+def _parse_numbers(text, n_columns, path):
+    # np.fromstring parses whitespace separated numbers in C, much faster than
+    # read_csv(sep=r'\s+'), but it only warns about invalid data
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            values = np.fromstring(text, sep=' ')
+        except (DeprecationWarning, ValueError):
+            raise ValueError(path + ': invalid numeric data')
+    if values.size % n_columns != 0:
+        raise ValueError(path + ': rows of different lengths')
+    return values.reshape(-1, n_columns)
+
+
+def _skip_header(file, n_lines, path):
+    # readline() rather than iterating, which would disable file.tell()
+    header = [file.readline() for i in range(n_lines)]
+    if not header[-1]:
+        raise ValueError(path + ': truncated header')
+    return header
+
+
+def _first_row_length(file, path):
+    # length of the first data row, leaving the file where it was
+    position = file.tell()
+    first_row = file.readline().split()
+    file.seek(position)
+    if not first_row:
+        return 0
+    try:
+        [float(value) for value in first_row]
+    except ValueError:
+        raise ValueError(path + ': header not followed by numeric data')
+    return len(first_row)
+
+
+def _iter_rows(file, n_columns, path, chunk_rows):
+    if chunk_rows is None:
+        yield _parse_numbers(file.read(), n_columns, path)
+        return
+    while True:
+        lines = list(itertools.islice(file, chunk_rows))
+        if not lines:
+            return
+        yield _parse_numbers(''.join(lines), n_columns, path)
+
+
+def read_ref(ref_path):
+    # only the first column (f0) of references is used
+    with open(ref_path) as ref_file:
+        n_columns = _first_row_length(ref_file, ref_path)
+        if n_columns == 0:
+            return np.zeros(0)
+        ref_values = _parse_numbers(ref_file.read(), n_columns, ref_path)
+    return np.ascontiguousarray(ref_values[:, 0])
+
+
+def _result_records(values):
+    records = np.empty(len(values),
+                       dtype=[('time', np.int64), ('f0', np.float64)])
+    records['time'] = values[:, 0]
+    records['f0'] = values[:, 1]
+    return records
+
+
+def iter_result(result_path, chunk_rows=None):
+    """Read a JSnoori .f0 file as arrays with fields 'time' and 'f0'.
+
+    With chunk_rows, yields arrays of at most that many frames instead of a
+    single one, so that very large files can be streamed.
+    """
+    with open(result_path) as result_file:
+        _skip_header(result_file, f0_header_lines, result_path)
+        n_columns = _first_row_length(result_file, result_path)
+        if n_columns == 0:
+            yield _result_records(np.zeros((0, 2)))
+            return
+        if n_columns != 2:
+            raise ValueError(result_path + ': expected time and f0 columns')
+        for values in _iter_rows(result_file, n_columns, result_path,
+                                 chunk_rows):
+            yield _result_records(values)
+
+
+def read_result(result_path):
+    return np.concatenate(list(iter_result(result_path)))
+
+
+def iter_features(features_path, dtype=np.float64, chunk_rows=None):
+    """Read a .features file as arrays with one field per column.
+
+    The first field is the time (int64), the others are of the given dtype
+    (e.g. np.float32 to halve memory). With chunk_rows, yields arrays of at
+    most that many frames instead of a single one.
+    """
+    with open(features_path) as features_file:
+        _skip_header(features_file, features_header_lines, features_path)
+        names = features_file.readline().split()
+        n_columns = _first_row_length(features_file, features_path)
+        if n_columns == len(names) + 1:
+            # no name for the time column
+            names = ['time'] + names
+        elif n_columns not in (0, len(names)):
+            raise ValueError(features_path + ': ' + str(len(names)) +
+                             ' column names for ' + str(n_columns) +
+                             ' columns')
+        if not names:
+            raise ValueError(features_path + ': no column names')
+
+        record_dtype = ([(names[0], np.int64)] +
+                        [(name, dtype) for name in names[1:]])
+        if n_columns == 0:
+            yield np.empty(0, dtype=record_dtype)
+            return
+        for values in _iter_rows(features_file, n_columns, features_path,
+                                 chunk_rows):
+            records = np.empty(len(values), dtype=record_dtype)
+            for i, name in enumerate(names):
+                records[name] = values[:, i]
+            yield records
+
+
+def read_features(features_path, dtype=np.float64):
+    return np.concatenate(list(iter_features(features_path, dtype)))
+
+
+def load_ref(ref_path):
+    # from the packed copy of the corpus if any, float64 as when parsed, so
+    # that scores do not depend on whether the corpus is packed
+    ref_values = packed_corpus.ref_values(ref_path)
+    if ref_values is not None:
+        return ref_values
+    return parse_cache.load(ref_path, 'ref', read_ref)
+
+
+def load_result(result_path):
+    result_values = parse_cache.load(result_path, 'f0', read_result)
+    return result_values['time'], result_values['f0']
+
+
+def load_features(features_path, dtype=np.float64):
+    # one cache entry per dtype; no dot in the kind, as the outdated entries
+    # of a kind are matched by kind.*
+    kind = 'features'
+    if np.dtype(dtype) != np.float64:
+        kind += '_' + np.dtype(dtype).name
+    feature_values = parse_cache.load(
+        features_path, kind, lambda path: read_features(path, dtype))
+    return pd.DataFrame.from_records(
+        feature_values, index=feature_values.dtype.names[0])
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+
+import dbm
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import shelve
+import sys
+from multiprocessing import Pool
+
+import matplotlib
+# render without a display, in any process
+matplotlib.use('Agg')
+import matplotlib.patches as mpatches  # noqa: E402
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+from matplotlib.ticker import FuncFormatter  # noqa: E402
+
+import bootstrap  # noqa: E402
+
+scripts_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              os.pardir)
+shelf_folder = os.path.join(scripts_folder, 'stats', 'shelf')
+gallery_folder = os.path.join(scripts_folder, os.pardir, 'gallery')
+# hashes of the data and spec of every rendered figure
+state_filename = 'gallery.json'
+
+# run whose error rates vs offsets and estimated offsets are in the gallery
+offsets_run = '2016-02-24-18-55-41'
+
+methods = ['martin', 'swipe', 'yin']
+method_colors = {'martin': 'r', 'swipe': 'g', 'yin': 'b'}
+noise_names = ['babble', 'factory1', 'factory2', 'pink', 'white']
+noise_colors = {'babble': 'red', 'factory1': 'green', 'factory2': 'blue',
+                'pink': 'magenta', 'white': 'cyan'}
+method_markers = {'martin': 'o', 'swipe': 's', 'yin': 'D'}
+
+
+def to_percent(y, position):
+    # Ignore the passed in position. This has the effect of scaling the default
+    # tick locations.
+    s = str(100 * y)
+
+    # The percent symbol needs escaping in latex
+    if matplotlib.rcParams['text.usetex'] is True:
+        return s + r'$\%$'
+    else:
+        return s + '%'
+
+formatter = FuncFormatter(to_percent)
+
+
+# Plotting functions: each one draws a figure from the data of its spec (the
+# values stored under the spec's keys in its shelf) and its parameters.
+
+def method_error_rates(data, x, title, xlabel, legend_loc='best',
+                       log2_x=False):
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel("F0 estimation error rate")
+    if log2_x:
+        ax.set_xscale('log', base=2)
+    ax.yaxis.set_major_formatter(formatter)
+
+    error_stats = data['error_stats']
+    error_intervals = data['error_intervals']
+    handles = [
+        ax.errorbar(data[x], error_stats[method],
+                    yerr=bootstrap.error_bars(error_stats[method],
+                                              error_intervals[method]),
+                    fmt=method_colors[method] + '-o', capsize=3,
+                    label=method)
+        for method in methods]
+    ax.legend(handles=handles, loc=legend_loc)
+    return fig
+
+
+def noise_error_rates(data, x, noises, plotted_methods, title, xlabel,
+                      legend_loc):
+    # one line per noise and method
+    fig = plt.figure()
+    fig.suptitle(title, fontsize=14, fontweight='bold')
+    ax = fig.add_subplot(111)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel("F0 estimation error rate")
+    ax.yaxis.set_major_formatter(formatter)
+
+    error_stats = data['error_stats']
+    error_intervals = data['error_intervals']
+    for noise in noises:
+        for method in plotted_methods:
+            ax.errorbar(data[x], error_stats[noise][method],
+                        yerr=bootstrap.error_bars(
+                            error_stats[noise][method],
+                            error_intervals[noise][method]),
+                        color=noise_colors[noise], linestyle='solid',
+                        marker=method_markers[method], markersize=4,
+                        capsize=2, label=noise + ' ' + method)
+
+    ax.legend(loc=legend_loc)
+    return fig
+
+
+def error_types(data):
+    # stacked error rates of each type, one subplot per method
+    snrs = data['snrs']
+    error_type_stats = data['error_type_stats']
+
+    fig, axes = plt.subplots(3, sharex=True, sharey=True)
+    axes[0].set_title("Error rates when random noise at certain SNR is added "
+                      "(1/5 dataset)", fontsize=14, fontweight='bold')
+    axes[-1].set_xlabel("signal-to-noise ratio (dB)")
+
+    for ax, method in zip(axes, methods):
+        ax.set_ylabel("error rate (" + method + ")")
+        ax.yaxis.set_major_formatter(formatter)
+
+        stats = error_type_stats[method]
+        ax.fill_between(snrs, 0, [es[0] for es in stats],
+                        facecolor='red', label='deviated')
+        ax.fill_between(snrs,
+                        [es[0] for es in stats],
+                        [es[0] + es[1] for es in stats],
+                        facecolor='yellow', label='incorrectly voiced')
+        ax.fill_between(snrs,
+                        [es[0] + es[1] for es in stats],
+                        [es[0] + es[1] + es[2] for es in stats],
+                        facecolor='cyan', label='incorrectly unvoiced')
+
+    red_patch = mpatches.Patch(color='red', label='deviated')
+    yellow_patch = mpatches.Patch(color='yellow', label='incorrectly voiced')
+    cyan_patch = mpatches.Patch(color='cyan', label='incorrectly unvoiced')
+    axes[0].legend(handles=[red_patch, yellow_patch, cyan_patch])
+
+    fig.set_size_inches(10, 18)
+    return fig
+
+
+def threshold_curves(data, method, threshold):
+    fig = plt.figure()
+    fig.suptitle(
+        "Error rates w.r.t. the maximum deviation allowed \n"
+        "(" + method + ", random noise at certain SNR, 1/5 dataset)",
+        fontsize=14, fontweight='bold')
+    ax = fig.add_subplot(111)
+    ax.set_xlabel("maximum frequency deviation (%)")
+    ax.set_ylabel("F0 estimation error rate")
+    ax.yaxis.set_major_formatter(formatter)
+
+    for snr in data['snrs']:
+        ax.plot(data['max_freq_deviation_percentages'],
+                data['threshold_curves'][(method, snr)],
+                linestyle='solid', label=str(snr) + ' dB')
+    ax.axvline(threshold, color='gray', linestyle='dashed')
+
+    ax.legend(loc='upper right')
+    return fig
+
+
+def offset_error_rates(data):
+    fig = plt.figure()
+    ax = fig.add_subplot(111)
+    ax.set_title("Error rates under different offsets", fontsize=14,
+                 fontweight='bold')
+    ax.set_xlabel("offset (ms)")
+    ax.set_ylabel("F0 estimation error rate")
+    ax.yaxis.set_major_formatter(formatter)
+
+    handles = [ax.plot(data['offsets'], data['error_stats'][method],
+                       method_colors[method] + '-o', label=method)[0]
+               for method in methods]
+    ax.legend(handles=handles)
+    return fig
+
+
+def estimated_offsets(data):
+    # histogram of the offsets per file, and offset over the corpus
+    lags = data['lags']
+    resolution = lags[1] - lags[0]
+    bins = np.append(lags, lags[-1] + resolution) - resolution / 2
+
+    fig, axes = plt.subplots(len(methods), sharex=True)
+    axes[0].set_title("Offsets of F0 estimations per file", fontsize=14,
+                      fontweight='bold')
+    axes[-1].set_xlabel("offset (ms)")
+    for ax, method in zip(axes, methods):
+        ax.hist(data['estimated_file_offsets'][method], bins=bins,
+                color=method_colors[method], label=method)
+        ax.axvline(data['estimated_offsets'][method], color='k',
+                   linestyle='dashed')
+        ax.set_ylabel("files")
+        ax.legend()
+    return fig
+
+
+def spec(filename, plot, shelf, keys, **params):
+    return {'filename': filename, 'plot': plot, 'shelf': shelf,
+            'keys': keys, 'params': params}
+
+
+def specs(offsets_runs=(offsets_run,)):
+    """Every figure of the gallery.
+
+    The data of the figures is stored by the scripts of stats/ in their
+    shelves; offsets_runs are the results runs (timestamps) whose shelves of
+    error_rates_vs_offsets.py and estimate_offsets.py are plotted, under
+    file names ending with the run unless it is offsets_run.
+    """
+    error_rates_keys = ['error_stats', 'error_intervals']
+    gallery_specs = [
+        spec('error_rates_vs_snrs.pdf', 'method_error_rates',
+             'data.for_snr.shelve', ['snrs'] + error_rates_keys,
+             x='snrs',
+             title="Error rates when random noise at certain SNR is added \n"
+                   "(1/5 dataset)",
+             xlabel="signal-to-noise ratio (dB)", legend_loc='upper right'),
+        spec('error_rates_vs_signal_levels.pdf', 'method_error_rates',
+             'data.for_signal_level.shelve', ['levels'] + error_rates_keys,
+             x='levels', title="Error rates under different signal levels",
+             xlabel="level (relative proportion)", log2_x=True),
+        spec('error_rates_white_noise_added.pdf', 'method_error_rates',
+             'data.for_white_noise.shelve',
+             ['noise_lambdas'] + error_rates_keys,
+             x='noise_lambdas',
+             title="Error rates when white noise is added (1/5 dataset)",
+             xlabel="white noise level", legend_loc='upper left'),
+        spec('error_rates_vs_snrs_error_types.pdf', 'error_types',
+             'data.for_snr.shelve', ['snrs', 'error_type_stats'])
+    ]
+
+    for noise in noise_names:
+        gallery_specs.append(spec(
+            'error_rates_random_noise_' + noise + '.pdf', 'noise_error_rates',
+            'data.for_random_noise.shelve',
+            ['noise_lambdas'] + error_rates_keys,
+            x='noise_lambdas', noises=[noise], plotted_methods=methods,
+            title="Error rates when random noise is added \n"
+                  "(sampled from same noise file, 1/5 dataset)",
+            xlabel="noise level", legend_loc='upper left'))
+        gallery_specs.append(spec(
+            'error_rates_random_noise_wrt_snr_' + noise + '.pdf',
+            'noise_error_rates', 'data.for_random_noise_wrt_snr.shelve',
+            ['snrs'] + error_rates_keys,
+            x='snrs', noises=[noise], plotted_methods=methods,
+            title="Error rates when random noise at certain SNR is added \n"
+                  "(sampled from same noise file, 1/5 dataset)",
+            xlabel="signal-to-noise ratio", legend_loc='upper right'))
+    for method in methods:
+        gallery_specs.append(spec(
+            'error_rates_random_noise_' + method + '.pdf',
+            'noise_error_rates', 'data.for_random_noise.shelve',
+            ['noise_lambdas'] + error_rates_keys,
+            x='noise_lambdas', noises=noise_names, plotted_methods=[method],
+            title="Error rates when random noise is added \n"
+                  "(for same estimation algorithm, 1/5 dataset)",
+            xlabel="noise level", legend_loc='upper left'))
+        gallery_specs.append(spec(
+            'error_rates_random_noise_wrt_snr_' + method + '.pdf',
+            'noise_error_rates', 'data.for_random_noise_wrt_snr.shelve',
+            ['snrs'] + error_rates_keys,
+            x='snrs', noises=noise_names, plotted_methods=[method],
+            title="Error rates when random noise at certain SNR is added \n"
+                  "(for same estimation algorithm, 1/5 dataset)",
+            xlabel="signal-to-noise ratio", legend_loc='lower left'))
+        gallery_specs.append(spec(
+            'error_rates_vs_thresholds_' + method + '.pdf',
+            'threshold_curves', 'data.for_snr.shelve',
+            ['snrs', 'max_freq_deviation_percentages', 'threshold_curves'],
+            method=method, threshold=20))
+
+    for run in offsets_runs:
+        # the figures of the default run keep their names
+        suffix = '' if run == offsets_run else '_' + run
+        gallery_specs.append(spec(
+            'error_rates_vs_offsets' + suffix + '.pdf', 'offset_error_rates',
+            'data.' + run + '.shelve', ['offsets', 'error_stats']))
+        gallery_specs.append(spec(
+            'estimated_offsets' + suffix + '.pdf', 'estimated_offsets',
+            'data.' + run + '.shelve',
+            ['lags', 'estimated_offsets', 'estimated_file_offsets']))
+    return gallery_specs
+
+
+def load_data(figure_spec):
+    # None if the shelf or one of the keys is missing
+    try:
+        with shelve.open(os.path.join(shelf_folder, figure_spec['shelf']),
+                         'r') as db:
+            return {key: db[key] for key in figure_spec['keys']}
+    except dbm.error + (KeyError,):
+        return None
+
+
+def digest(figure_spec, data):
+    # changes with the data, the spec or the code drawing the figures: this
+    # module (plotting functions, styles, formatter, saving) and the error bars
+    sha1 = hashlib.sha1()
+    sha1.update(inspect.getsource(sys.modules[__name__]).encode())
+    sha1.update(inspect.getsource(bootstrap.error_bars).encode())
+    sha1.update(json.dumps(figure_spec, sort_keys=True).encode())
+    sha1.update(pickle.dumps(data, protocol=4))
+    return sha1.hexdigest()
+
+
+def render(figure_spec, data):
+    plot = getattr(sys.modules[__name__], figure_spec['plot'])
+    fig = plot(data, **figure_spec['params'])
+    # at the size of the figure: papertype='a4', which the plotting scripts
+    # passed before, only applied to PostScript output, and current
+    # matplotlib rejects it for PDF
+    fig.savefig(os.path.join(gallery_folder, figure_spec['filename']))
+    plt.close(fig)
+
+
+def _render_task(task):
+    figure_spec, data, figure_digest = task
+    render(figure_spec, data)
+    return figure_spec['filename'], figure_digest
+
+
+def build(shelves=None, offsets_runs=(offsets_run,), force=False,
+          processes=None):
+    """Render the figures of the gallery whose data or spec changed.
+
+    With shelves (file names in stats/shelf), only the figures plotting
+    their data are considered. Figures are rendered by a pool of processes.
+    """
+    state_path = os.path.join(shelf_folder, state_filename)
+    try:
+        with open(state_path) as state_file:
+            state = json.load(state_file)
+    except FileNotFoundError:
+        state = {}
+
+    tasks = []
+    for figure_spec in specs(offsets_runs):
+        if shelves is not None and figure_spec['shelf'] not in shelves:
+            continue
+        filename = figure_spec['filename']
+        data = load_data(figure_spec)
+        if data is None:
+            print("Skipping", filename, "(no data in",
+                  figure_spec['shelf'] + ")")
+            continue
+        figure_digest = digest(figure_spec, data)
+        if (not force and state.get(filename) == figure_digest and
+                os.path.exists(os.path.join(gallery_folder, filename))):
+            continue
+        tasks.append((figure_spec, data, figure_digest))
+
+    if tasks:
+        with Pool(processes) as pool:
+            for filename, figure_digest in pool.imap_unordered(_render_task,
+                                                               tasks):
+                print("Rendered", filename)
+                state[filename] = figure_digest
+
+    os.makedirs(shelf_folder, exist_ok=True)
+    with open(state_path, 'w') as state_file:
+        json.dump(state, state_file, indent=1, sort_keys=True)
+    return len(tasks)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+import os
+
+import numpy as np
+
+import instrument
+
+
+def _run_task(task):
+    func, cell, ref_index, args = task
+    return cell, ref_index, instrument.run_task(func, *args)
+
+
+def evaluate_grid(pool, func, cells, refs, db=None, keys=None,
+                  chunksize=None, monitor=None):
+    """Evaluate func(ref, *args) for every reference of every cell.
+
+    cells maps a cell key, e.g. (noise, method, level), to the extra
+    arguments given to func after the reference. The tasks of the whole grid
+    are submitted at once to the given pool, so that the workers keep busy
+    across cells instead of waiting for the slowest file of each one.
+
+    func returns a tuple of arrays per reference. The first one is kept for
+    every reference (one row each, in the order of refs), so that statistics
+    over files can be computed later on; the others are summed up per cell.
+
+    If db (a shelve) is given, the results of each cell are stored there under
+    keys[cell] as soon as the cell is complete, and cells already stored are
+    not computed again. An interrupted run thus resumes where it stopped.
+
+    Every task is accounted for by monitor (an instrument.Monitor), if given.
+    """
+    results = {}
+    if db is not None:
+        for cell in cells:
+            if keys[cell] in db:
+                results[cell] = db[keys[cell]]
+    pending_cells = [cell for cell in cells if cell not in results]
+
+    tasks = [(func, cell, ref_index, (ref,) + tuple(cells[cell]))
+             for cell in pending_cells for ref_index, ref in enumerate(refs)]
+    if chunksize is None:
+        # a few chunks per worker, to balance the load at the end of the run
+        chunksize = max(1, len(tasks) // (4 * os.cpu_count()))
+    if monitor is not None:
+        monitor.add_tasks(len(tasks))
+
+    per_file = {}
+    partial_totals = {}
+    n_remaining = {cell: len(refs) for cell in pending_cells}
+    for cell, ref_index, (counts, record) in pool.imap_unordered(
+            _run_task, tasks, chunksize):
+        if monitor is not None:
+            monitor.task_done(record, cell=list(cell), ref=refs[ref_index])
+        if cell not in per_file:
+            per_file[cell] = np.zeros((len(refs), len(counts[0])))
+            partial_totals[cell] = tuple(counts[1:])
+        else:
+            partial_totals[cell] = tuple(
+                total + count
+                for total, count in zip(partial_totals[cell], counts[1:]))
+        per_file[cell][ref_index] = counts[0]
+
+        n_remaining[cell] -= 1
+        if n_remaining[cell] == 0:
+            results[cell] = ((per_file.pop(cell),) +
+                             partial_totals.pop(cell))
+            if db is not None:
+                db[keys[cell]] = results[cell]
+                db.sync()
+    return results
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+# JSON lines logs of the runs, in scripts/logs wherever the scripts are run
+# from (as stats/shelf)
+log_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          os.pardir, 'logs')
+
+# time spent in each stage by this process, since the start of its current
+# task in the workers
+_stage_seconds = defaultdict(float)
+
+
+@contextmanager
+def stage(name):
+    # add the time spent in the block to the given stage
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stage_seconds[name] += time.perf_counter() - start
+
+
+def run_task(func, *args):
+    """Call func(*args) in a worker and return its result with a record of
+    the call: process, start and end times, and time spent in each stage.
+    """
+    _stage_seconds.clear()
+    start = time.time()
+    result = func(*args)
+    record = {'pid': os.getpid(), 'start': start, 'end': time.time(),
+              'stages': dict(_stage_seconds)}
+    return result, record
+
+
+def _run_indexed_task(task):
+    func, index, args = task
+    return index, run_task(func, *args)
+
+
+class Monitor:
+    """Progress of a run of tasks on a pool of n_workers processes, one task
+    per file.
+
+    Every event is written as a JSON line to path (by default
+    scripts/logs/<script>.<time>.jsonl): 'start', 'task' for every task
+    done, with the number of tasks left to start (queue_depth), files/s, ETA
+    and worker utilisation so far, and 'summary' when the monitor is closed.
+    The summary is printed as well, unless summary is False.
+
+    The stages of the tasks are the instrument.stage() blocks they went
+    through; those run by this process while the monitor was open are
+    reported separately.
+    """
+
+    def __init__(self, name=None, n_tasks=0, n_workers=None, path=None,
+                 summary=True):
+        self.name = name or os.path.splitext(
+            os.path.basename(sys.argv[0]))[0]
+        self.n_tasks = n_tasks
+        self.n_workers = n_workers or os.cpu_count()
+        self.summary = summary
+        if path is None:
+            os.makedirs(log_folder, exist_ok=True)
+            path = os.path.join(log_folder, self.name + '.' +
+                                time.strftime('%Y-%m-%d-%H-%M-%S') + '.jsonl')
+        self.path = path
+        self._file = open(path, 'a')
+        self._last_flush = time.time()
+
+        self.start = time.time()
+        self.tasks_start = None
+        self.n_done = 0
+        self.busy_seconds = 0.0
+        self.task_seconds = []
+        self.stage_seconds = defaultdict(float)
+        self._own_stage_seconds = dict(_stage_seconds)
+        self.emit('start', n_tasks=n_tasks, n_workers=self.n_workers,
+                  argv=sys.argv)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close('failed' if exc_type else 'done')
+
+    def emit(self, event, **fields):
+        record = OrderedDict([('event', event), ('run', self.name),
+                              ('time', round(time.time(), 3))])
+        record.update(fields)
+        self._file.write(json.dumps(record) + '\n')
+        # flushing every line would slow down runs of short tasks
+        if time.time() - self._last_flush > 1:
+            self._file.flush()
+            self._last_flush = time.time()
+
+    def add_tasks(self, n_tasks):
+        self.n_tasks += n_tasks
+        if self.tasks_start is None:
+            self.tasks_start = time.time()
+
+    def progress(self):
+        now = time.time()
+        elapsed = now - (self.tasks_start or self.start)
+        files_per_s = self.n_done / elapsed if elapsed > 0 else 0.0
+        n_left = self.n_tasks - self.n_done
+        return OrderedDict([
+            ('done', self.n_done),
+            ('total', self.n_tasks),
+            # tasks not started yet, assuming that every worker is busy
+            ('queue_depth', max(0, n_left - self.n_workers)),
+            ('files_per_s', round(files_per_s, 3)),
+            ('eta_s', round(n_left / files_per_s, 1)
+             if files_per_s > 0 else None),
+            ('utilisation', round(self.busy_seconds /
+                                  (elapsed * self.n_workers), 3)
+             if elapsed > 0 else None)
+        ])
+
+    def task_done(self, record, **tags):
+        """Account for a task given the record returned by run_task(); tags
+        (method, cell...) are only written to the log.
+        """
+        if self.tasks_start is None:
+            self.tasks_start = record['start']
+        self.n_done += 1
+        seconds = record['end'] - record['start']
+        self.busy_seconds += seconds
+        self.task_seconds.append(seconds)
+        for name, stage_seconds in record['stages'].items():
+            self.stage_seconds[name] += stage_seconds
+        fields = OrderedDict(sorted(tags.items()))
+        fields.update([
+            ('pid', record['pid']),
+            ('seconds', round(seconds, 4)),
+            ('stages', {name: round(stage_seconds, 4) for name, stage_seconds
+                        in record['stages'].items()})
+        ])
+        fields.update(self.progress())
+        self.emit('task', **fields)
+
+    def _imap_indexed(self, pool, func, iterable, chunksize):
+        # (index in iterable, result) of every call, as they come
+        tasks = [(func, index, tuple(args))
+                 for index, args in enumerate(iterable)]
+        self.add_tasks(len(tasks))
+        for index, (result, record) in pool.imap_unordered(
+                _run_indexed_task, tasks, chunksize):
+            self.task_done(record, args=[
+                arg for arg in tasks[index][2]
+                if isinstance(arg, (str, int, float))])
+            yield index, result
+
+    def imap_unordered(self, pool, func, iterable, chunksize=1):
+        """Yield the results of func(*args) for every args of iterable as
+        they come, with every call accounted for. Calls are tagged with their
+        string and number arguments.
+        """
+        for index, result in self._imap_indexed(pool, func, iterable,
+                                                chunksize):
+            yield result
+
+    def starmap(self, pool, func, iterable, chunksize=1):
+        # same results as pool.starmap(func, iterable), accounted for as
+        # imap_unordered()
+        results = {}
+        for index, result in self._imap_indexed(pool, func, iterable,
+                                                chunksize):
+            results[index] = result
+        return [results[index] for index in range(len(results))]
+
+    def close(self, status='done'):
+        elapsed = time.time() - self.start
+        busy_seconds = self.busy_seconds or 1.0
+        task_seconds = np.array(self.task_seconds or [0.0])
+        own_stages = {
+            name: seconds - self._own_stage_seconds.get(name, 0.0)
+            for name, seconds in _stage_seconds.items()
+            if seconds > self._own_stage_seconds.get(name, 0.0)}
+        summary = OrderedDict([('status', status),
+                               ('elapsed_s', round(elapsed, 3))])
+        summary.update(self.progress())
+        summary.update([
+            ('task_seconds', OrderedDict([
+                ('mean', round(float(task_seconds.mean()), 4)),
+                ('p50', round(float(np.percentile(task_seconds, 50)), 4)),
+                ('p95', round(float(np.percentile(task_seconds, 95)), 4)),
+                ('max', round(float(task_seconds.max()), 4))])),
+            ('stages', OrderedDict(
+                (name, OrderedDict([
+                    ('seconds', round(seconds, 3)),
+                    ('share', round(seconds / busy_seconds, 3))]))
+                for name, seconds in sorted(self.stage_seconds.items(),
+                                            key=lambda item: -item[1]))),
+            ('own_stages', OrderedDict(
+                (name, round(seconds, 3))
+                for name, seconds in sorted(own_stages.items(),
+                                            key=lambda item: -item[1])))
+        ])
+        self.emit('summary', **summary)
+        self._file.close()
+
+        if self.summary:
+            print_summary(self.name, summary)
+            print("Log written to", self.path)
+        return summary
+
+
+def print_summary(name, summary):
+    print("%s: %s, %d/%d files in %.1f s (%.2f files/s, workers %.0f%% busy)"
+          % (name, summary['status'], summary['done'], summary['total'],
+             summary['elapsed_s'], summary['files_per_s'],
+             100 * (summary['utilisation'] or 0)))
+    print("  per file: mean %(mean).3f s, median %(p50).3f s, "
+          "95th percentile %(p95).3f s, max %(max).3f s" %
+          summary['task_seconds'])
+    for stage_name, stage in summary['stages'].items():
+        print("  %-20s %10.1f s %5.1f%% of worker time" %
+              (stage_name, stage['seconds'], 100 * stage['share']))
+    for stage_name, seconds in summary['own_stages'].items():
+        print("  %-20s %10.1f s in the main process" % (stage_name, seconds))
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+import scoring
+
+
+# part of the keys of stored lag curves, to be increased whenever the output
+# of lag_curve() changes
+lag_version = 2
+
+
+def _tracks(values):
+    # f0 relative to its mean over voiced frames, minus 1 (0 where unvoiced),
+    # and the voicing mask: the contours are compared where both are voiced
+    values = np.nan_to_num(np.asarray(values, dtype=np.float64))
+    voiced = values > 0
+    if not voiced.any():
+        return np.zeros(len(values)), np.zeros(len(values))
+    return (np.where(voiced, values / values[voiced].mean() - 1.0, 0.0),
+            voiced.astype(np.float64))
+
+
+def _correlation(a, b, n, steps):
+    # irfft(A * conj(B))[k] = sum_j a[j] b[j - k], negative k at the end
+    return np.fft.irfft(np.fft.rfft(a, n) * np.conj(np.fft.rfft(b, n)),
+                        n)[steps % n]
+
+
+def lag_curve(ref_values, result_times, result_values, max_lag=40,
+              resolution=1):
+    """Normalized cross-correlation of the reference and estimated tracks for
+    each lag.
+
+    Lags (ms) go from -max_lag to max_lag by steps of resolution, with the
+    meaning of the offsets of scoring.align_offsets(): the estimate at time
+    t - lag is compared with the reference at time t. Both tracks are
+    linearly interpolated on a shared grid of the given resolution, as their
+    frames do not line up (the reference starts at 16 ms), and the contours
+    are correlated where both are voiced, normalized by their energy there;
+    the sums for all lags are computed at once by FFT. Curves of several
+    files can be summed up before looking for their peak.
+    """
+    lags = np.arange(-max_lag, max_lag + resolution, resolution)
+    times = scoring.ref_times(len(ref_values))
+    if len(times) == 0 or len(result_times) == 0:
+        return lags, np.zeros(len(lags))
+
+    grid = np.arange(times[0] - max_lag, times[-1] + max_lag + resolution,
+                     resolution)
+    ref_track, ref_voiced = [
+        np.interp(grid, times, values, left=0.0, right=0.0)
+        for values in _tracks(ref_values)]
+    result_track, result_voiced = [
+        np.interp(grid, result_times, values, left=0.0, right=0.0)
+        for values in _tracks(result_values)]
+
+    n = 1 << int(2 * len(grid) - 1).bit_length()
+    steps = np.round(lags / resolution).astype(int)
+    products = _correlation(ref_track, result_track, n, steps)
+    energy = (_correlation(ref_track ** 2, result_voiced, n, steps) *
+              _correlation(ref_voiced, result_track ** 2, n, steps))
+    # rounding errors of the FFT aside, 0 only without overlap
+    energy = np.maximum(energy, 0.0)
+    curve = np.zeros(len(lags))
+    overlap = energy > 1e-12
+    curve[overlap] = products[overlap] / np.sqrt(energy[overlap])
+    return lags, curve
+
+
+def best_lag(lags, curve):
+    # peak of the curve, refined between lags by fitting a parabola to the
+    # peak and its two neighbours
+    peak = int(np.argmax(curve))
+    if peak == 0 or peak == len(curve) - 1:
+        return float(lags[peak])
+    y0, y1, y2 = curve[peak - 1:peak + 2]
+    curvature = y0 - 2 * y1 + y2
+    if curvature >= 0:
+        return float(lags[peak])
+    shift = 0.5 * (y0 - y2) / curvature
+    return float(lags[peak] + shift * (lags[1] - lags[0]))
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import zlib
+from functools import lru_cache
+
+import numpy as np
+from scipy.io import wavfile
+from scipy.signal import lfilter
+
+import packed_corpus
+
+# full scale of 16-bit samples, as sox normalizes them
+full_scale = 32768
+
+# active speech level of ITU-T P.56 (method B)
+p56_time_constant = 0.03  # s
+p56_hangover = 0.2  # s
+p56_margin = 15.9  # dB
+
+
+def read_wav(path):
+    # sampling rate and samples as floats in [-1, 1), from the packed copy
+    # of the corpus if any
+    packed = packed_corpus.wav_samples(path)
+    rate, samples = packed if packed is not None else wavfile.read(path)
+    if samples.dtype != np.int16:
+        raise ValueError(path + ": 16-bit PCM expected, got " +
+                         str(samples.dtype))
+    return rate, samples / full_scale
+
+
+def write_wav(path, rate, samples):
+    """Write samples in [-1, 1) as a 16-bit WAV file, rounded and clipped as
+    sox does (without its dither). The file is replaced atomically.
+    """
+    samples = np.clip(np.round(samples * full_scale),
+                      -full_scale, full_scale - 1).astype(np.int16)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                    suffix='.wav.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as wav_file:
+            wavfile.write(wav_file, rate, samples)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def max_amplitude(samples):
+    # 1 / the volume adjustment printed by "sox FILE -n stat -v"
+    return np.abs(samples).max() if len(samples) else 0.0
+
+
+@lru_cache(maxsize=None)
+def load_noise(path):
+    """Sampling rate, 16-bit samples and maximum amplitude of a noise file.
+
+    The samples are memory-mapped from the file itself (RAW files are taken
+    as 16 kHz), so that a noise is never decoded nor copied in memory: every
+    process slicing it shares the pages of the file. Noises loaded before a
+    pool is created are inherited by its workers.
+    """
+    if os.path.splitext(path)[1] == '.raw':
+        rate, samples = 16000, np.memmap(path, dtype='<i2', mode='r')
+    else:
+        rate, samples = wavfile.read(path, mmap=True)
+        if samples.dtype != np.int16:
+            raise ValueError(path + ": 16-bit PCM expected, got " +
+                             str(samples.dtype))
+    # in int, as the absolute value of -32768 overflows int16
+    max_amp = max(-int(samples.min()), int(samples.max())) / full_scale
+    return rate, samples, max_amp
+
+
+def white_noise(n_samples, rng):
+    # as "sox -p synth whitenoise": uniform over the full scale
+    return rng.uniform(-1, 1, n_samples)
+
+
+def segment_begin(n_noise_samples, n_samples, rng):
+    # random begin of a noise segment of n_samples samples, as "sox NOISE -p
+    # trim BEGIN DURATION" at a random begin
+    if n_noise_samples < n_samples:
+        raise ValueError("noise shorter than the signal (%d < %d samples)" %
+                         (n_noise_samples, n_samples))
+    return rng.randint(0, n_noise_samples - n_samples + 1)
+
+
+def noise_segment(noise, begin, n_samples):
+    # 16-bit samples (of load_noise()) are scaled to [-1, 1), only over the
+    # segment
+    segment = noise[begin:begin + n_samples]
+    if segment.dtype == np.int16:
+        return segment / full_scale
+    return segment
+
+
+def mix_gains(noise_lambda, max_amp_signal, max_amp_noise):
+    """Gains of signal and noise in signal + noise_lambda * noise, as mixed by
+    "sox -m", which halves the sum of its two inputs.
+
+    Where the peaks of signal and noise could add up to clipping (the sum of
+    their maximum amplitudes, measured over the whole signal and noise files,
+    reaches 1), both are scaled by alpha = 1 / that sum beforehand.
+    """
+    max_amp_sum = max_amp_signal + noise_lambda * max_amp_noise
+
+    # avoid clipping
+    alpha = 1 / max_amp_sum if max_amp_sum >= 1 else 1.0
+    return alpha / 2, alpha * noise_lambda / 2
+
+
+def active_speech_level(samples, rate):
+    """Active speech level of samples in [-1, 1) as a mean power, with the
+    activity factor (share of active samples), after ITU-T P.56 method B.
+
+    A sample is active while the envelope of the signal (|samples| smoothed
+    twice with a 30 ms time constant) is above a threshold, or was in the
+    last 200 ms. Thresholds are tried by octaves from the least significant
+    bit up to full scale; the level is the mean power over the active samples
+    for the threshold p56_margin dB below it, interpolated between octaves.
+    A signal never reaching the lowest threshold (e.g. a few samples of one
+    bit over silence) has no active samples: its long-term level is returned,
+    with an activity of 0.
+
+    This follows the description of method B, but was not checked against a
+    reference implementation (FaNT, or sv56demo of the ITU-T Software Tool
+    Library): levels may differ from theirs by a fraction of a dB, e.g. for
+    the envelope around the first and last samples.
+    """
+    sum_square = np.dot(samples, samples)
+    if sum_square == 0:
+        return 0.0, 0.0
+    g = np.exp(-1 / (rate * p56_time_constant))
+    envelope = lfilter([1 - g], [1, -g],
+                       lfilter([1 - g], [1, -g], np.abs(samples)))
+    hangover = int(np.ceil(p56_hangover * rate))
+    indices = np.arange(len(samples))
+
+    levels_db, differences, counts = [], [], []
+    for threshold in 2.0 ** np.arange(-15, 1):
+        above = envelope >= threshold
+        # index of the last sample above the threshold so far
+        last_above = np.maximum.accumulate(
+            np.where(above, indices, -hangover - 1))
+        n_active = np.count_nonzero(indices - last_above <= hangover)
+        if n_active == 0:
+            break
+        levels_db.append(10 * np.log10(sum_square / n_active))
+        differences.append(levels_db[-1] - 20 * np.log10(threshold))
+        counts.append(n_active)
+        if differences[-1] <= p56_margin:
+            break
+    if not levels_db:
+        return sum_square / len(samples), 0.0
+
+    level_db, n_active = levels_db[-1], counts[-1]
+    if differences[-1] <= p56_margin and len(levels_db) > 1:
+        t = ((differences[-2] - p56_margin) /
+             (differences[-2] - differences[-1]))
+        level_db = levels_db[-2] + t * (levels_db[-1] - levels_db[-2])
+        n_active = counts[-2] + t * (counts[-1] - counts[-2])
+    return 10 ** (level_db / 10), n_active / len(samples)
+
+
+def snr_gain(noise, snr, speech_level):
+    """Gain of noise in speech + gain * noise for the given SNR (dB) relative
+    to speech_level, a mean power such as the one of active_speech_level().
+    The noise level is its mean power, without frequency weighting, as with
+    FaNT "filter_add_noise -u -d".
+    """
+    noise_level = np.dot(noise, noise) / len(noise)
+    return np.sqrt(speech_level / noise_level / 10 ** (snr / 10))
+
+
+def file_seed(*names):
+    # seed made of the given names (e.g. output path), so that every output is
+    # reproducible whatever the order of the tasks
+    return zlib.crc32(' '.join(map(str, names)).encode())
+
+
+def file_rng(*names):
+    return np.random.RandomState(file_seed(*names))
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import json
+import os
+import time
+
+from registry import file_checksum
+
+# journals of the outputs completed in a folder, in that folder: one JSON line
+# per output, appended once it is written; every shard of a run keeps its own
+# journal, completed.<k>of<n>.jsonl
+journal_prefix = 'completed'
+
+
+def parse_shard(text):
+    # K/N from the command line, 1 <= K <= N
+    k, sep, n = text.partition('/')
+    try:
+        k, n = int(k), int(n)
+    except ValueError:
+        k = n = 0
+    if not sep or not 1 <= k <= n:
+        raise argparse.ArgumentTypeError('expected K/N with 1 <= K <= N, '
+                                         'got ' + text)
+    return k, n
+
+
+def add_arguments(parser):
+    # options shared by the scripts generating datasets
+    parser.add_argument('-j', '--jobs', type=int,
+                        help='number of worker processes '
+                             '(default: one per CPU)')
+    parser.add_argument('--shard', type=parse_shard,
+                        help='only generate the K-th of N shards of the '
+                             'source files, e.g. 2/4')
+    parser.add_argument('--verify', action='store_true',
+                        help='check the checksums of the outputs already '
+                             'generated, not only their sizes and '
+                             'modification times')
+
+
+def plain(params):
+    # params as read back from a journal (tuples become lists...)
+    return json.loads(json.dumps(params))
+
+
+def in_shard(path, shard):
+    # sources are split by name, the same way whatever their order
+    if shard is None:
+        return True
+    k, n = shard
+    digest = hashlib.sha1(os.path.basename(path).encode()).hexdigest()
+    return int(digest, 16) % n == k - 1
+
+
+def journal_path(folder, shard=None):
+    if shard is None:
+        return os.path.join(folder, journal_prefix + '.jsonl')
+    return os.path.join(folder, '%s.%dof%d.jsonl' % ((journal_prefix,) +
+                                                     shard))
+
+
+def load(folder):
+    """Entries of the outputs completed in folder by output name, from the
+    journals of every shard; the entry of an output completed last wins,
+    whichever journal holds it (entries without completion time, from older
+    journals, lose to the others and otherwise go by their order in the
+    journal). Lines cut short by a crash are ignored.
+    """
+    entries = {}
+    if not os.path.isdir(folder):
+        return entries
+    for name in sorted(os.listdir(folder)):
+        if not (name.startswith(journal_prefix + '.') and
+                name.endswith('.jsonl')):
+            continue
+        with open(os.path.join(folder, name)) as journal:
+            for line in journal:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                previous = entries.get(entry['name'])
+                if (previous is None or entry.get('completed_ns', 0) >=
+                        previous.get('completed_ns', 0)):
+                    entries[entry['name']] = entry
+    return entries
+
+
+def append(folder, entries, shard=None):
+    if not entries:
+        return
+    with open(journal_path(folder, shard), 'a') as journal:
+        for entry in entries:
+            journal.write(json.dumps(entry, sort_keys=True) + '\n')
+        journal.flush()
+        os.fsync(journal.fileno())
+
+
+def source_entry(path, previous=None):
+    """Path, size, modification time and checksum of a source file. The
+    checksum of the previous entry is reused if the file did not change.
+    """
+    stat = os.stat(path)
+    entry = {'source': path, 'source_size': stat.st_size,
+             'source_mtime_ns': stat.st_mtime_ns}
+    if (previous is not None and previous.get('source') == path and
+            previous['source_size'] == stat.st_size and
+            previous['source_mtime_ns'] == stat.st_mtime_ns):
+        entry['source_sha1'] = previous['source_sha1']
+    else:
+        entry['source_sha1'] = file_checksum(path)
+    return entry
+
+
+def output_entry(path, params, source, **fields):
+    """Journal entry of the output path, made from the source described by
+    source_entry() with the given parameters (JSON-serializable, e.g. the
+    distortion and seed); other fields are kept as well. The time it is
+    made tells which entry of an output is the latest.
+    """
+    stat = os.stat(path)
+    entry = dict(fields)
+    entry.update(source)
+    entry.update({'name': os.path.basename(path),
+                  'params': plain(params),
+                  'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                  'sha1': file_checksum(path),
+                  'completed_ns': time.time_ns()})
+    return entry
+
+
+def is_valid(entry, path, params, source, verify=False):
+    """Whether the journal entry of path is still valid: made from the same
+    source file with the same parameters, the output being unchanged since
+    (same size and modification time, and same checksum if verify).
+    """
+    if entry is None or not os.path.isfile(path):
+        return False
+    if (entry['source'] != source['source'] or
+            entry['source_sha1'] != source['source_sha1'] or
+            entry['params'] != plain(params)):
+        return False
+    stat = os.stat(path)
+    if (entry['size'] != stat.st_size or
+            entry['mtime_ns'] != stat.st_mtime_ns):
+        return False
+    return not verify or entry['sha1'] == file_checksum(path)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+
+import numpy as np
+from scipy.io import wavfile
+
+import corpus_index
+import f0_files
+import packed_corpus
+
+parser = argparse.ArgumentParser(
+    description='Pack the WAV files of corpus folders and the references of '
+                'their ref/ sub-folders into a few large shards, read through '
+                'memory maps instead of file by file.')
+parser.add_argument('folders', nargs='+', help='corpus folders')
+parser.add_argument('-s', '--shard-size', type=int,
+                    default=packed_corpus.shard_size // 2 ** 20,
+                    help='size of the shards in MiB (default: %(default)s)')
+args = parser.parse_args()
+
+
+def arrays(folder):
+    # references first, so that scoring reads them in a row
+    refs_folder = os.path.join(folder, 'ref')
+    wav_names = sorted(name for name in os.listdir(folder)
+                       if os.path.splitext(name)[1] == '.wav')
+    for wav_name in wav_names:
+        ref_path = os.path.join(refs_folder,
+                                corpus_index.ref_filename(wav_name))
+        if os.path.isfile(ref_path):
+            yield 'ref', ref_path, f0_files.read_ref(ref_path), {}
+    for wav_name in wav_names:
+        wav_path = os.path.join(folder, wav_name)
+        rate, samples = wavfile.read(wav_path)
+        if samples.dtype != np.int16:
+            raise ValueError(wav_path + ": 16-bit PCM expected, got " +
+                             str(samples.dtype))
+        yield 'wav', wav_path, samples, {
+            'rate': int(rate),
+            'n_channels': 1 if samples.ndim == 1 else samples.shape[1]}
+
+for folder in args.folders:
+    print("Packing", folder)
+    index = packed_corpus.pack(folder, arrays(folder),
+                               args.shard_size * 2 ** 20)
+    print(len(index['wav']), "WAV files and", len(index['ref']),
+          "references in", len(index['shards']), "shards")
+
+print("Done.")
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+
+# packed copy of a corpus folder, in its packed/ sub-folder: shards of about
+# shard_size bytes holding the f0 values of the references (float64, as
+# parsed), then the samples of the WAV files (int16), back to back, and
+# index.json giving the shard and offset of every array
+packed_folder = 'packed'
+index_filename = 'index.json'
+shard_size = 2 ** 30
+dtypes = {'ref': np.dtype('<f8'), 'wav': np.dtype('<i2')}
+# version of the layout of the shards, packed copies of another one are
+# ignored (references were float32 in version 1)
+packed_format = 2
+# arrays start at multiples of alignment bytes in the shards
+alignment = 8
+
+
+def pack(folder, arrays, shard_size=shard_size):
+    """Write the packed copy of a corpus folder, replacing any previous one,
+    and return its index.
+
+    arrays yields (kind, path, values, fields): kind is 'ref' or 'wav', the
+    path of the file the values come from, and other fields of its entry
+    (sampling rate...). The size and modification time of the file tell
+    whether the entry is outdated. The index is written last, so that readers
+    see either the previous shards or the new ones, and the previous shards
+    are only removed by the next pack, as other processes may still be
+    reading them.
+    """
+    folder = os.path.abspath(folder)
+    packed_path = os.path.join(folder, packed_folder)
+    os.makedirs(packed_path, exist_ok=True)
+    # new names, as the previous shards may be in use
+    prefix = 'shard-%x-' % time.time_ns()
+    index = OrderedDict([('format', packed_format), ('shards', []),
+                         ('ref', OrderedDict()), ('wav', OrderedDict())])
+    shard_file = None
+    offset = 0
+    try:
+        for kind, path, values, fields in arrays:
+            data = np.ascontiguousarray(values, dtype=dtypes[kind]).tobytes()
+            if shard_file is None or (offset and
+                                      offset + len(data) > shard_size):
+                if shard_file is not None:
+                    shard_file.close()
+                shard_name = prefix + '%04d.bin' % len(index['shards'])
+                shard_file = open(os.path.join(packed_path, shard_name), 'wb')
+                index['shards'].append(shard_name)
+                offset = 0
+            shard_file.write(data)
+            padding = -len(data) % alignment
+            shard_file.write(bytes(padding))
+
+            stat = os.stat(path)
+            entry = OrderedDict([('shard', shard_name), ('offset', offset),
+                                 ('length', len(values)),
+                                 ('size', stat.st_size),
+                                 ('mtime_ns', stat.st_mtime_ns)])
+            entry.update(fields)
+            index[kind][os.path.basename(path)] = entry
+            offset += len(data) + padding
+    finally:
+        if shard_file is not None:
+            shard_file.close()
+
+    fd, tmp_path = tempfile.mkstemp(dir=packed_path, suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp_file:
+        json.dump(index, tmp_file, indent=1)
+        tmp_file.write('\n')
+    index_path = os.path.join(packed_path, index_filename)
+    kept = set(index['shards'])
+    try:
+        with open(index_path) as index_file:
+            kept.update(json.load(index_file).get('shards', []))
+    except FileNotFoundError:
+        pass
+    os.replace(tmp_path, index_path)
+    for name in os.listdir(packed_path):
+        if name.endswith('.bin') and name not in kept:
+            os.remove(os.path.join(packed_path, name))
+    return index
+
+
+def load_index(folder):
+    # index of the packed copy of a corpus folder, empty if there is none or
+    # if it has another layout; read again whenever index.json is replaced
+    index_path = os.path.join(folder, packed_folder, index_filename)
+    try:
+        mtime_ns = os.stat(index_path).st_mtime_ns
+    except FileNotFoundError:
+        return {}
+    return _load_index(index_path, mtime_ns)
+
+
+@lru_cache(maxsize=None)
+def _load_index(index_path, mtime_ns):
+    try:
+        with open(index_path) as index_file:
+            index = json.load(index_file)
+    except FileNotFoundError:
+        return {}
+    return index if index.get('format') == packed_format else {}
+
+
+@lru_cache(maxsize=None)
+def _shard(path):
+    # every shard is mapped once per process
+    return np.memmap(path, dtype=np.uint8, mode='r')
+
+
+def _lookup(kind, folder, path):
+    # entry of a packed file, None if not packed or changed since
+    folder = os.path.abspath(folder)
+    entry = load_index(folder).get(kind, {}).get(os.path.basename(path))
+    if entry is None:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    if (entry['size'] != stat.st_size or
+            entry['mtime_ns'] != stat.st_mtime_ns):
+        return None
+    return entry
+
+
+def _view(folder, entry, dtype):
+    shard = _shard(os.path.join(os.path.abspath(folder), packed_folder,
+                                entry['shard']))
+    n_bytes = entry['length'] * entry.get('n_channels', 1) * dtype.itemsize
+    return shard[entry['offset']:entry['offset'] + n_bytes].view(dtype)
+
+
+def wav_samples(path):
+    """Sampling rate and int16 samples of a WAV file from the packed copy of
+    its folder, as a read-only view of the memory-mapped shard; None if the
+    file is not packed or changed since.
+    """
+    folder = os.path.dirname(path)
+    entry = _lookup('wav', folder, path)
+    if entry is None:
+        return None
+    samples = _view(folder, entry, dtypes['wav'])
+    if entry.get('n_channels', 1) > 1:
+        samples = samples.reshape(-1, entry['n_channels'])
+    return entry['rate'], samples
+
+
+def ref_values(ref_path):
+    """f0 values (float64) of a reference in the ref/ sub-folder of a corpus
+    folder, from the packed copy of the corpus, as wav_samples().
+    """
+    folder = os.path.dirname(os.path.dirname(ref_path))
+    entry = _lookup('ref', folder, ref_path)
+    if entry is None:
+        return None
+    return _view(folder, entry, dtypes['ref'])
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+import glob
+import os
+import tempfile
+
+import numpy as np
+
+# parsed arrays are stored under this folder, in a tree mirroring the one of
+# the parsed files (one sub-folder per results timestamp folder); set to None
+# to always parse
+cache_basedir = "/home/bdeng/datasets/cache"
+
+
+def cache_path(path, kind):
+    # the size and modification time of the parsed file are part of the name,
+    # so that a modified file never hits an outdated entry
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    folder = os.path.join(cache_basedir, os.path.dirname(path).lstrip(os.sep))
+    filename = '%s.%s.%d-%d.npy' % (os.path.basename(path), kind,
+                                    stat.st_size, stat.st_mtime_ns)
+    return os.path.join(folder, filename)
+
+
+def load(path, kind, parse, mmap_mode=None):
+    """Return parse(path), parsing the file only once ever.
+
+    kind tells apart different parsings of the same file. The parsed array is
+    kept as .npy, which can be memory-mapped with mmap_mode='r'.
+    """
+    if cache_basedir is None:
+        return parse(path)
+
+    cached = cache_path(path, kind)
+    try:
+        return np.load(cached, mmap_mode=mmap_mode)
+    except (OSError, ValueError):
+        pass
+
+    values = parse(path)
+
+    folder = os.path.dirname(cached)
+    os.makedirs(folder, exist_ok=True)
+    outdated_pattern = (glob.escape(os.path.basename(path)) + '.' + kind +
+                        '.*-*.npy')
+    for outdated in glob.glob(os.path.join(glob.escape(folder),
+                                           outdated_pattern)):
+        if outdated != cached:
+            try:
+                os.remove(outdated)
+            except OSError:
+                pass
+
+    # write then rename, as several workers may parse the same file at once
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as tmp_file:
+        np.save(tmp_file, values)
+    os.replace(tmp_path, cached)
+    return values
@@ -3,26 +3,28 @@
 import os
 
 import numpy as np
-import pandas as pd
 
-refs_folder = "/home/bdeng/datasets/speechdata_16kHz/ref"
+import corpus_index
+import f0_files
+
+corpus_folder = "/home/bdeng/datasets/speechdata_16kHz"
+refs_folder = os.path.join(corpus_folder, 'ref')
 refs = os.listdir(refs_folder)
 
 
 def samples_stats(ref):
-    ref_values = pd.read_csv(
-        os.path.join(refs_folder, ref),
-        sep=' ',
-        header=None,
-        names=['f0'],
-        dtype={0: np.float64},
-        usecols=[0],
-        squeeze=True,
-    )
-    ref_values.index = ref_values.index * 10 + 16
-    n_values = len(ref_values)
-    n_nonzero = len(ref_values.nonzero()[0])
-    return n_values, n_nonzero
+    # frame counts of a reference, from the corpus index if its WAV file is
+    # indexed and unchanged, else from the reference itself (the WAV file is
+    # never measured)
+    wav_path = os.path.join(corpus_folder, 'mic' + ref[3:-3] + '.wav')
+    entry = corpus_index.load_index(corpus_folder).get(
+        os.path.basename(wav_path))
+    if (entry is not None and entry.get('ref') == ref and
+            os.path.isfile(wav_path) and
+            corpus_index.is_current(entry, wav_path)):
+        return entry['n_frames'], entry['n_voiced']
+    ref_values = f0_files.load_ref(os.path.join(refs_folder, ref))
+    return len(ref_values), int(np.count_nonzero(ref_values))
 
 aggregated_stats = [samples_stats(ref) for ref in refs]
 n_values_total = sum(stats[0] for stats in aggregated_stats)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import re
+
+import registry
+
+parser = argparse.ArgumentParser(
+    description='Register the runs listed in doc/experiment_settings.txt, '
+                'made before the run scripts wrote manifests.')
+parser.add_argument(
+    'settings_file', nargs='?',
+    default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         os.pardir, os.pardir, 'doc',
+                         'experiment_settings.txt'),
+    help='list of runs, one "timestamp description" per line, after '
+         '"corpus: NAME" lines giving the corpus of the runs below')
+args = parser.parse_args()
+
+basedirs = {'results': "/home/bdeng/datasets/results",
+            'features': "/home/bdeng/datasets/features"}
+methods = ['martin', 'swipe', 'yin']
+# the corpora named in the list are in there
+datasets_folder = "/home/bdeng/datasets"
+
+
+def parse_distortion(description):
+    # e.g. 'level: 0.5', 'babble noise: 0.0125', 'white noise (file): 0.1',
+    # 'white noise: 0.1' (generated), 'pink noise: SNR 5 dB', or 'distorted
+    # audio' for the features run whose distortion was not recorded
+    if description == 'distorted audio':
+        return {'distorted': True}
+    match = re.fullmatch(r'(\w+) noise(?: \(file\))?: SNR (-?\d+) dB',
+                         description)
+    if match:
+        return {'noise': match.group(1), 'snr': int(match.group(2))}
+    match = re.fullmatch(r'white noise: ([\d.]+)', description)
+    if match:
+        return {'white_noise': float(match.group(1))}
+    match = re.fullmatch(r'(\w+) noise \(file\): ([\d.]+)', description)
+    if not match:
+        match = re.fullmatch(r'(\w+) noise: ([\d.]+)', description)
+    if match:
+        return {'noise': match.group(1), 'noise_level': float(match.group(2))}
+    match = re.fullmatch(r'level: ([\d.]+)', description)
+    if match:
+        return {'level': float(match.group(1))}
+    raise ValueError('unknown distortion: ' + description)
+
+
+kind = 'results'
+corpus = None
+with open(args.settings_file) as settings_file:
+    for line in settings_file:
+        line = line.strip()
+        if not line:
+            continue
+        if line.endswith(':'):
+            # the runs below are of this kind
+            kind = line[:-1]
+            continue
+        if line.startswith('corpus:'):
+            # the runs below were made from this corpus
+            corpus = os.path.join(datasets_folder, line.split(None, 1)[1])
+            continue
+        if corpus is None:
+            raise ValueError('no corpus given before ' + line)
+
+        # 'starting: 0, -t: 10' then the distortion, if any
+        run, description = line.split(None, 1)
+        items = description.split(', ')
+        settings = {}
+        for item in items[2:]:
+            settings.update(parse_distortion(item))
+
+        folder = os.path.join(basedirs[kind], run)
+        if not os.path.isdir(folder):
+            print("Skipping", run, "(no folder", folder + ")")
+            continue
+        print("Registering", run, settings)
+        registry.register(kind, run, folder, None, corpus, settings,
+                          {'params': ', '.join(items[:2])}, methods)
+
+print("Done.")
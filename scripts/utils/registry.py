@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+import ast
+import functools
+import hashlib
+import json
+import os
+import tempfile
+
+# one manifest per run (runs/<kind>/<run>.json), and index.json mapping the
+# key of every run (its kind, corpus and settings) to its name and folder
+registry_folder = "/home/bdeng/datasets/registry"
+index_filename = 'index.json'
+
+
+def parse_setting(text):
+    # NAME=VALUE from the command line, VALUE being a Python literal (5, 0.025)
+    # or else a string (babble)
+    name, sep, value = text.partition('=')
+    if not sep or not name:
+        raise ValueError('expected NAME=VALUE, got ' + text)
+    try:
+        value = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        pass
+    return name, value
+
+
+def run_key(kind, corpus, **settings):
+    """Key of a run in the index, e.g. run_key('results', CORPUS,
+    noise='babble', snr=5).
+
+    kind is 'results' (F0 estimations) or 'features'; corpus is the folder of
+    the corpus the dataset was made from (or the dataset itself, for the
+    original audio), so that runs on a subset and on the full corpus are told
+    apart; settings describe the distortion of the dataset, and are empty for
+    the original audio.
+    """
+    return ' '.join([kind, os.path.abspath(corpus)] +
+                    ['%s=%r' % (name, settings[name])
+                     for name in sorted(settings)])
+
+
+def file_checksum(path):
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as file:
+        for block in iter(functools.partial(file.read, 1 << 20), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def file_entries(folder):
+    entries = {}
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        entries[name] = {'size': os.path.getsize(path),
+                         'sha1': file_checksum(path)}
+    return entries
+
+
+def _write_json(path, data):
+    # write then rename, so that readers never see a partial file
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp_file:
+        json.dump(data, tmp_file, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def manifest_path(kind, run):
+    return os.path.join(registry_folder, 'runs', kind, run + '.json')
+
+
+def register(kind, run, folder, dataset, corpus, settings, tool, methods):
+    """Write the manifest of a finished run and add it to the index.
+
+    run is the name of the run (its timestamp folder name), tool the scripts
+    and parameters used; the files of folder are listed with their checksums.
+    dataset may be None for past runs, whose audio folder was not recorded.
+    A run registered with the same kind, corpus and settings as an earlier
+    one replaces it in the index.
+    """
+    manifest = {
+        'run': run,
+        'kind': kind,
+        'folder': os.path.abspath(folder),
+        'dataset': dataset and os.path.abspath(dataset),
+        'corpus': os.path.abspath(corpus),
+        'settings': settings,
+        'tool': tool,
+        'methods': methods,
+        'files': file_entries(folder)
+    }
+    _write_json(manifest_path(kind, run), manifest)
+
+    index_path = os.path.join(registry_folder, index_filename)
+    index = dict(_read_index(index_path))
+    index[run_key(kind, corpus, **settings)] = {'run': run,
+                                                'folder': manifest['folder']}
+    _write_json(index_path, index)
+    load_index.cache_clear()
+    return manifest
+
+
+def _read_index(index_path):
+    try:
+        with open(index_path) as index_file:
+            return json.load(index_file)
+    except FileNotFoundError:
+        return {}
+
+
+@functools.lru_cache(maxsize=1)
+def load_index():
+    return _read_index(os.path.join(registry_folder, index_filename))
+
+
+def find(kind, corpus, **settings):
+    # name and folder of the run on corpus with the given settings
+    key = run_key(kind, corpus, **settings)
+    try:
+        return load_index()[key]
+    except KeyError:
+        raise KeyError('no run registered as ' + key) from None
+
+
+def run_folder(kind, corpus, **settings):
+    return find(kind, corpus, **settings)['folder']
+
+
+def registered_runs(kind):
+    try:
+        names = os.listdir(os.path.join(registry_folder, 'runs', kind))
+    except FileNotFoundError:
+        return []
+    return sorted(os.path.splitext(name)[0] for name in names
+                  if name.endswith('.json'))
+
+
+def load_manifest(kind, run):
+    with open(manifest_path(kind, run)) as manifest_file:
+        return json.load(manifest_file)
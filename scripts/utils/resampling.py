@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+import os
+import shutil
+import tempfile
+import wave
+from functools import lru_cache
+from math import gcd
+
+import numpy as np
+from scipy.io import wavfile
+from scipy.signal import firwin, upfirdn
+
+import instrument
+
+# input samples per block, rounded down to a multiple of the decimation factor
+block_length = 2 ** 18
+
+
+@lru_cache(maxsize=None)
+def polyphase_filter(rate_in, rate_out):
+    """Interpolation and decimation factors from rate_in to rate_out, with the
+    taps of the anti-aliasing filter designed as by scipy.signal.resample_poly
+    (Kaiser window, beta 5, 10 zero crossings), once per pair of rates.
+
+    The taps are delayed so that blocks starting at a multiple of the
+    decimation factor all line up with the output; the last two values are
+    the shift of the output and the half length of the filter.
+    """
+    divisor = gcd(rate_in, rate_out)
+    up, down = rate_out // divisor, rate_in // divisor
+    max_rate = max(up, down)
+    half_len = 10 * max_rate
+    taps = firwin(2 * half_len + 1, 1 / max_rate, window=('kaiser', 5.0)) * up
+    delay = -half_len % down
+    taps = np.concatenate([np.zeros(delay), taps])
+    return up, down, taps, (half_len + delay) // down, half_len
+
+
+def resampled_blocks(samples, rate_in, rate_out, block_length=block_length):
+    """Yield samples (along the first axis) resampled from rate_in to
+    rate_out by consecutive blocks, which put together equal
+    scipy.signal.resample_poly(samples, up, down).
+
+    Only one block of samples, with the context the filter needs on both
+    sides, is read at a time, so that samples may be a memory-mapped file of
+    any length.
+    """
+    up, down, taps, shift, half_len = polyphase_filter(rate_in, rate_out)
+    n_in = len(samples)
+    n_out = -(-n_in * up // down)
+    block_length = max(down, block_length // down * down)
+    context = -(-(half_len // up + 1) // down) * down
+
+    for start in range(0, n_in, block_length):
+        stop = start + block_length
+        first = start * up // down
+        last = stop * up // down if stop < n_in else n_out
+        begin, end = start - context, stop + context
+        block = np.asarray(samples[max(0, begin):min(n_in, end)],
+                           dtype=np.float64)
+        # zeros beyond both ends, as resample_poly
+        padding = [(max(0, begin) - begin, end - min(n_in, end))]
+        block = np.pad(block, padding + [(0, 0)] * (block.ndim - 1),
+                       'constant')
+        resampled = upfirdn(taps, block, up, down, axis=0)
+        offset = shift - begin * up // down
+        yield resampled[first + offset:last + offset]
+
+
+def resample_file(src, dst, rate_out, block_length=block_length):
+    """Resample a 16-bit WAV file to rate_out, by blocks from the
+    memory-mapped source to the destination, which is replaced atomically.
+    Samples are rounded and clipped (sox would dither them). Returns the
+    duration of the file in seconds.
+    """
+    rate_in, samples = wavfile.read(src, mmap=True)
+    if samples.dtype != np.int16:
+        raise ValueError(src + ": 16-bit PCM expected, got " +
+                         str(samples.dtype))
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst),
+                                    suffix='.wav.tmp')
+    os.close(fd)
+    try:
+        if rate_in == rate_out:
+            shutil.copyfile(src, tmp_path)
+        else:
+            with wave.open(tmp_path, 'wb') as wav_file:
+                wav_file.setnchannels(1 if samples.ndim == 1
+                                      else samples.shape[1])
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(rate_out)
+                blocks = resampled_blocks(samples, rate_in, rate_out,
+                                          block_length)
+                while True:
+                    with instrument.stage('resample'):
+                        block = next(blocks, None)
+                    if block is None:
+                        break
+                    with instrument.stage('write'):
+                        wav_file.writeframes(
+                            np.clip(np.round(block), -32768, 32767)
+                            .astype('<i2').tobytes())
+        os.replace(tmp_path, dst)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return len(samples) / rate_in
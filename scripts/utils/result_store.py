@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+import hashlib
+import os
+
+import instrument
+import scoring
+
+
+def fingerprint(folder, filenames):
+    # identify files by their names, sizes and modification times, which is
+    # enough to notice new runs or regenerated files without reading them
+    sha1 = hashlib.sha1()
+    for filename in sorted(filenames):
+        stat = os.stat(os.path.join(folder, filename))
+        sha1.update(('%s %d %d\n' % (filename, stat.st_size,
+                                     stat.st_mtime_ns)).encode())
+    return sha1.hexdigest()
+
+
+def input_fingerprints(refs_folder, refs, results_folder, method):
+    results = [scoring.result_filename(ref, method) for ref in refs]
+    with instrument.stage('fingerprints'):
+        return [fingerprint(refs_folder, refs),
+                fingerprint(results_folder, results)]
+
+
+def cell_key(fingerprints, **params):
+    """Key of the results of one cell of an experiment grid in a shelve.
+
+    params are the settings of the cell (method, noise, level, offset,
+    threshold...) and fingerprints the ones of its input files, so that a cell
+    is computed again only if one of them changes. The version of the
+    scoring code is part of every key as well.
+    """
+    params = dict(params, score_version=scoring.score_version)
+    settings = ['%s=%r' % (name, params[name]) for name in sorted(params)]
+    return ' '.join(settings + list(fingerprints))
@@ -4,15 +4,32 @@ import argparse
 import os
 import subprocess
 import time
-from itertools import repeat
 from multiprocessing import Pool
 
+import instrument
+import registry
+import virtual_corpus
+
 parser = argparse.ArgumentParser(
     description='Run F0 estimations on the given dataset.')
 parser.add_argument('dataset', help='path to the dataset')
+parser.add_argument('-s', '--setting', action='append', default=[],
+                    type=registry.parse_setting, metavar='NAME=VALUE',
+                    help='distortion of the dataset, e.g. noise=babble snr=5 '
+                         '(repeat for each setting, none for original audio)')
+parser.add_argument('-c', '--corpus',
+                    help='corpus the dataset was made from, e.g. the 1/5 '
+                         'subset for its noisy variants (default: the '
+                         'dataset itself, required with --setting)')
+parser.add_argument('--log', metavar='FILE',
+                    help='JSON lines log of the run (default: under logs/)')
 args = parser.parse_args()
+if args.setting and args.corpus is None:
+    parser.error('--corpus is required with --setting')
 
 dataset = args.dataset
+corpus = args.corpus or dataset
+settings = dict(args.setting)
 
 extractor_path = "/home/bdeng/Documents/FeaturesPitchExtractionScripts"
 extractor_scripts_paths = {
@@ -31,27 +48,35 @@ features_folder = os.path.join(features_basedir, timestamp)
 os.makedirs(features_folder)
 
 
-def estimate(wav_path, method):
+def estimate(wav_path, recipe, method):
     print("Calculating on", wav_path)
     features_filepath = os.path.join(
         features_folder,
         os.path.splitext(os.path.basename(wav_path))[0] + "." + method +
         ".features")
-    subprocess.check_call(
-        ["jython",
-         extractor_scripts_paths[method],
-         "-i", wav_path, "-o", features_filepath] + extractor_params)
-
-wav_paths = []
-
-for root, dirs, files in os.walk(dataset):
-    for name in files:
-        if os.path.splitext(name)[1] == '.wav':
-            wav_paths.append(os.path.join(root, name))
-
-pool = Pool()
-pool.starmap(estimate, zip(wav_paths, repeat("martin")))
-pool.starmap(estimate, zip(wav_paths, repeat("swipe")))
-pool.starmap(estimate, zip(wav_paths, repeat("yin")))
+    # files of a virtual corpus are synthesized for the time of the estimation
+    with virtual_corpus.opened(wav_path, recipe) as actual_path, \
+            instrument.stage('jython'):
+        subprocess.check_call(
+            ["jython",
+             extractor_scripts_paths[method],
+             "-i", actual_path, "-o", features_filepath] + extractor_params)
+
+wav_files = virtual_corpus.wav_files(dataset)
+
+with Pool() as pool, instrument.Monitor(path=args.log) as monitor:
+    # a JVM is started for every file, time one start alone to tell it apart
+    # from the estimations
+    with instrument.stage('jvm_startup'):
+        subprocess.check_call(["jython", "-c", "pass"])
+    monitor.starmap(pool, estimate,
+                    [(wav_path, recipe, method)
+                     for method in ["martin", "swipe", "yin"]
+                     for wav_path, recipe in wav_files])
+
+registry.register('features', timestamp, features_folder, dataset, corpus,
+                  settings, {'scripts': extractor_scripts_paths,
+                             'params': extractor_params},
+                  ['martin', 'swipe', 'yin'])
 
 print("Done.")
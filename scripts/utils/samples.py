@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+import pandas as pd
+
+import f0_files
+import scoring
+
+
+def features_filename(ref, method):
+    # ref*.f0 -> mic*.<method>.features
+    return 'mic' + ref[3:-3] + '.' + method + '.features'
+
+
+def create_samples(ref_path, features_path, offset,
+                   max_freq_deviation_percentage, ref_voiced=False):
+    """Features of every frame, labelled with the correctness of the f0
+    estimated there (column 'correctness').
+
+    With ref_voiced, whether the reference is voiced is added as well (column
+    'ref-voiced').
+    """
+    ref_values = f0_files.load_ref(ref_path)
+    times = scoring.ref_times(len(ref_values))
+
+    feature_values = f0_files.load_features(features_path)
+
+    result_values = feature_values.loc[:, 'f00_hz']
+    estimated_values = scoring.align(
+        times, result_values.index.values + offset, result_values.values)
+    deviation = scoring.deviation(ref_values, estimated_values)
+
+    correctness = deviation < max_freq_deviation_percentage / 100
+    feature_values['correctness'] = pd.Series(correctness, index=times)
+    if ref_voiced:
+        feature_values['ref-voiced'] = pd.Series(ref_values > 0, index=times)
+    # reference has fewer estimations near the end of audio file
+    feature_values.dropna(inplace=True)
+    return feature_values
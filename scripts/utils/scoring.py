@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+import f0_files
+import instrument
+
+# part of the keys of stored results, to be increased whenever the output of
+# score_file() changes
+score_version = 3
+
+# reference values are given every 10 ms, starting from 16 ms
+ref_start = 16
+ref_step = 10
+
+
+def result_filename(ref, method):
+    # ref*.f0 -> mic*.<method>.f0
+    return 'mic' + ref[3:-3] + '.' + method + '.f0'
+
+
+def ref_times(n_values):
+    return np.arange(n_values) * ref_step + ref_start
+
+
+def align(times, result_times, result_values):
+    """Pick the estimate nearest to each of the given times.
+
+    Same outcome as reindexing the estimates on a 1 ms grid and running
+    interpolate(method='nearest'): ties go to the earlier estimate, and times
+    outside of the estimated span get 0.0 (unvoiced).
+    """
+    valid = ~np.isnan(result_values)
+    result_times, result_values = result_times[valid], result_values[valid]
+
+    aligned = np.zeros(len(times))
+    if len(result_times) == 0:
+        return aligned
+
+    midpoints = (result_times[1:] + result_times[:-1]) / 2
+    indices = np.searchsorted(midpoints, times, side='left')
+    inside = (times >= result_times[0]) & (times <= result_times[-1])
+    aligned[inside] = result_values[indices[inside]]
+    return aligned
+
+
+def align_offsets(times, result_times, result_values, offsets):
+    """align() for several offsets of the estimates at once.
+
+    Returns one row per offset. Shifting the estimates by an offset is the same
+    as shifting the given times by its opposite, so a single lookup is done.
+    """
+    shifted_times = (np.asarray(times)[np.newaxis, :] -
+                     np.asarray(offsets)[:, np.newaxis])
+    aligned = align(shifted_times.ravel(), result_times, result_values)
+    return aligned.reshape(shifted_times.shape)
+
+
+def deviation(ref_values, estimated_values):
+    # the best denominator to filter out false positive voiced values, for
+    # that human voice is always higher than 100 * 20% = 20 Hz
+    ref_values_no_zero = np.where(ref_values == 0.0, 100.0, ref_values)
+    return np.absolute(estimated_values - ref_values) / ref_values_no_zero
+
+
+def error_mask(ref_values, estimated_values, max_freq_deviation_percentage):
+    return (deviation(ref_values, estimated_values) >
+            max_freq_deviation_percentage / 100)
+
+
+# counts computed by score(), in this order:
+# - n_values: reference frames
+# - n_errors: frames deviating by more than the threshold, the reference
+#   being taken as 100 Hz where unvoiced
+# - n_deviated: gross pitch errors, i.e. errors where both are voiced
+# - n_incorrectly_voiced: voiced estimation of an unvoiced reference
+# - n_incorrectly_unvoiced: unvoiced estimation of a voiced reference
+# - n_voiced: frames where both are voiced
+# - n_fine, fine_deviation_sum, fine_deviation_square_sum: number, sum and
+#   sum of squares of the relative deviations of the remaining voiced frames
+metric_names = ['n_values', 'n_errors', 'n_deviated', 'n_incorrectly_voiced',
+                'n_incorrectly_unvoiced', 'n_voiced', 'n_fine',
+                'fine_deviation_sum', 'fine_deviation_square_sum']
+
+
+def score(ref_values, estimated_values, max_freq_deviation_percentage):
+    threshold = max_freq_deviation_percentage / 100
+    ref_voiced = ref_values != 0.0
+    estimated_voiced = estimated_values != 0.0
+    both_voiced = ref_voiced & estimated_voiced
+
+    deviations = deviation(ref_values, estimated_values)
+    voiced_deviations = deviations[both_voiced]
+    gross = voiced_deviations > threshold
+    fine_deviations = voiced_deviations[~gross]
+
+    return np.array([
+        len(ref_values),
+        np.count_nonzero(deviations > threshold),
+        np.count_nonzero(gross),
+        np.count_nonzero(estimated_voiced & ~ref_voiced),
+        np.count_nonzero(ref_voiced & ~estimated_voiced),
+        np.count_nonzero(both_voiced),
+        len(fine_deviations),
+        fine_deviations.sum(),
+        np.square(fine_deviations).sum(),
+    ], dtype=np.float64)
+
+
+# edges of the bins of deviation_histogram(): relative deviations from 0 to
+# 100%, by steps of 0.1%
+deviation_edges = np.arange(1001) / 1000
+
+
+def deviation_histogram(ref_values, estimated_values):
+    """Counts of deviations in the bins (edge[i - 1], edge[i]].
+
+    The first bin holds exact estimations and the last one deviations beyond
+    100%, so that the number of errors for any threshold on the edges can be
+    recovered from it, whatever the size of the corpus.
+    """
+    bins = np.searchsorted(deviation_edges,
+                           deviation(ref_values, estimated_values),
+                           side='left')
+    return np.bincount(bins, minlength=len(deviation_edges) + 1)
+
+
+def error_rate_curve(histogram, n_values, max_freq_deviation_percentages):
+    # error rates for the given thresholds, which must be multiples of 0.1%
+    edge_indices = np.rint(
+        np.asarray(max_freq_deviation_percentages) * 10).astype(int)
+    if not np.allclose(deviation_edges[edge_indices] * 100,
+                       max_freq_deviation_percentages):
+        raise ValueError('thresholds must be multiples of 0.1%')
+    n_above = np.cumsum(histogram[::-1])[::-1]
+    return n_above[edge_indices + 1] / n_values
+
+
+def totals(counts):
+    # counts of score() by name, summed over files if given one row per file
+    counts = np.asarray(counts)
+    if counts.ndim == 2:
+        counts = counts.sum(axis=0)
+    return dict(zip(metric_names, counts))
+
+
+def error_rate(counts):
+    counts = totals(counts)
+    return counts['n_errors'] / counts['n_values']
+
+
+def fine_deviation_stats(counts):
+    # mean and standard deviation of the relative deviations of fine pitch
+    counts = totals(counts)
+    mean = counts['fine_deviation_sum'] / counts['n_fine']
+    variance = counts['fine_deviation_square_sum'] / counts['n_fine'] - mean**2
+    return mean, np.sqrt(max(variance, 0.0))
+
+
+def load_aligned(ref_path, result_path, offset):
+    with instrument.stage('read'):
+        ref_values = f0_files.load_ref(ref_path)
+        result_times, result_values = f0_files.load_result(result_path)
+    with instrument.stage('align'):
+        estimated_values = align(ref_times(len(ref_values)),
+                                 result_times + offset, result_values)
+    return ref_values, estimated_values
+
+
+def score_file(ref_path, result_path, offset, max_freq_deviation_percentage):
+    # counts of score() and deviation histogram
+    ref_values, estimated_values = load_aligned(ref_path, result_path, offset)
+    with instrument.stage('score'):
+        return (score(ref_values, estimated_values,
+                      max_freq_deviation_percentage),
+                deviation_histogram(ref_values, estimated_values))
+
+
+def error_counts_for_offsets(ref_values, result_times, result_values, offsets,
+                             max_freq_deviation_percentage):
+    # number of errors for each offset, in the order of offsets
+    estimated_values = align_offsets(ref_times(len(ref_values)),
+                                     result_times, result_values, offsets)
+    return np.count_nonzero(
+        error_mask(ref_values, estimated_values,
+                   max_freq_deviation_percentage),
+        axis=1)
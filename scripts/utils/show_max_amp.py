@@ -1,19 +1,16 @@
 #!/usr/bin/env python3
 
 import os
-import subprocess
 from multiprocessing import Pool
 
+import corpus_index
+
 dataset = "/home/bdeng/datasets/speechdata_16kHz"
 
 
 def vol_adjustment(src):
-    vol_adjustment = subprocess.run(
-        ["sox", src, "-n", "stat", "-v"],
-        stderr=subprocess.PIPE,
-        universal_newlines=True
-    ).stderr
-    return float(vol_adjustment[:-1])
+    # as printed by "sox SRC -n stat -v", from the corpus index
+    return 1 / corpus_index.properties(src)['max_amplitude']
 
 wav_paths = []
 
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from functools import lru_cache
+
+import numpy as np
+
+import instrument
+import mixing
+
+# manifest of a virtual corpus, at its root: the recipe of every WAV file,
+# under its path relative to the root
+manifest_filename = 'corpus.json'
+
+
+def recipe(source, signal_gain=1.0, noise=None, offset=0, seed=None,
+           noise_gain=0.0):
+    """Distorted variant of the WAV file source:
+    signal_gain * source + noise_gain * noise.
+
+    noise is the path of a noise file, read from the sample offset on, or
+    'white' for white noise drawn with the given seed, or None.
+    """
+    return {'source': source, 'signal_gain': float(signal_gain),
+            'noise': noise, 'offset': int(offset), 'seed': seed,
+            'noise_gain': float(noise_gain)}
+
+
+def is_identity(recipe):
+    # the source unchanged, as in subsets of a corpus
+    return recipe['signal_gain'] == 1.0 and recipe['noise'] is None
+
+
+def actual_path(path, recipe):
+    """Path of an actual WAV file with the samples of the given file, when
+    there is one: the file itself, or the source of an unchanged file (of a
+    subset of a corpus). Raises ValueError for distorted virtual files.
+    """
+    if recipe is None:
+        return path
+    if is_identity(recipe):
+        return recipe['source']
+    raise ValueError(path + " is only described by its recipe")
+
+
+def noise_samples(recipe, n_samples):
+    if recipe['noise'] == 'white':
+        return mixing.white_noise(n_samples,
+                                  np.random.RandomState(recipe['seed']))
+    return mixing.noise_segment(mixing.load_noise(recipe['noise'])[1],
+                                recipe['offset'], n_samples)
+
+
+def apply(recipe, signal, noise=None):
+    # samples of the variant, given the samples of its source, and the ones of
+    # its noise if already drawn
+    samples = recipe['signal_gain'] * signal
+    if recipe['noise'] is not None:
+        if noise is None:
+            noise = noise_samples(recipe, len(signal))
+        samples += recipe['noise_gain'] * noise
+    return samples
+
+
+def synthesize(recipe):
+    # sampling rate and samples of the variant
+    rate, signal = mixing.read_wav(recipe['source'])
+    return rate, apply(recipe, signal)
+
+
+def write_manifest(root, recipes):
+    """Describe the virtual corpus rooted at root in its manifest.
+
+    recipes maps the paths of the WAV files of the corpus (all of them under
+    root) to their recipes. The manifest is replaced atomically.
+    """
+    root = os.path.abspath(root)
+    manifest = {}
+    for path, path_recipe in recipes.items():
+        relative_path = os.path.relpath(os.path.abspath(path), root)
+        if relative_path.startswith(os.pardir):
+            raise ValueError(path + " is not under " + root)
+        manifest[relative_path] = path_recipe
+
+    os.makedirs(root, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=root, suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp_file:
+        json.dump(manifest, tmp_file, indent=1, sort_keys=True)
+        tmp_file.write('\n')
+    os.replace(tmp_path, os.path.join(root, manifest_filename))
+    load_manifest.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def load_manifest(root):
+    with open(os.path.join(root, manifest_filename)) as manifest_file:
+        return json.load(manifest_file)
+
+
+def find_root(folder):
+    # root of the virtual corpus holding folder, which needs not exist, or
+    # None
+    folder = os.path.abspath(folder)
+    while True:
+        if os.path.isfile(os.path.join(folder, manifest_filename)):
+            return folder
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            return None
+        folder = parent
+
+
+def wav_files(dataset):
+    """(path, recipe) of every WAV file under the dataset folder, sorted by
+    path.
+
+    Files of a virtual corpus holding the dataset are listed with their
+    recipes, unless they were written out: actual files have no recipe.
+    """
+    files = {}
+    for root, dirs, names in os.walk(dataset):
+        for name in names:
+            if os.path.splitext(name)[1] == '.wav':
+                files[os.path.normpath(os.path.join(root, name))] = None
+
+    corpus_root = find_root(dataset)
+    if corpus_root is not None:
+        prefix = os.path.relpath(os.path.abspath(dataset), corpus_root)
+        for relative_path, path_recipe in load_manifest(corpus_root).items():
+            if prefix != os.curdir and not relative_path.startswith(
+                    prefix + os.sep):
+                continue
+            path = os.path.normpath(os.path.join(
+                dataset, os.path.relpath(relative_path, prefix)))
+            files.setdefault(path, path_recipe)
+    return sorted(files.items())
+
+
+@contextmanager
+def opened(path, recipe):
+    """Path of an actual WAV file with the samples of the given file: the
+    file itself or its unchanged source, or else a temporary file of the same
+    name synthesized from its recipe, deleted on exit.
+    """
+    if recipe is None or is_identity(recipe):
+        yield actual_path(path, recipe)
+        return
+    tmp_folder = tempfile.mkdtemp()
+    try:
+        tmp_path = os.path.join(tmp_folder, os.path.basename(path))
+        with instrument.stage('synthesis'):
+            mixing.write_wav(tmp_path, *synthesize(recipe))
+        yield tmp_path
+    finally:
+        shutil.rmtree(tmp_folder)
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+import registry
+import scoring
+
+# one partition per run and method (<run>/<method>/), each column of frames
+# stored as .npy next to a meta.json; catalog.json gathers the meta of every
+# partition, so that queries select partitions without opening them
+warehouse_folder = "/home/bdeng/datasets/warehouse"
+catalog_filename = 'catalog.json'
+
+# frame columns: index of the file in the partition's list of files, time of
+# the reference frame (ms), reference and aligned estimated f0 (Hz, 0 when
+# unvoiced) and voicing flags
+columns = ['file', 'time', 'ref_f0', 'estimated_f0', 'ref_voiced',
+           'estimated_voiced']
+
+
+def partition_folder(run, method):
+    return os.path.join(warehouse_folder, run, method)
+
+
+def _refs(manifest, method, refs_folder):
+    # references with a result in the run
+    return [ref for ref in sorted(os.listdir(refs_folder))
+            if scoring.result_filename(ref, method) in manifest['files']]
+
+
+def _sources(manifest, method, refs_folder, refs):
+    # fingerprint of the files a partition is made from: checksums of the
+    # results as registered, sizes and modification times of the references
+    sha1 = hashlib.sha1(manifest['folder'].encode())
+    for ref in refs:
+        stat = os.stat(os.path.join(refs_folder, ref))
+        result = manifest['files'][scoring.result_filename(ref, method)]
+        sha1.update(('\n%s %d %d %s' % (ref, stat.st_size, stat.st_mtime_ns,
+                                         result['sha1'])).encode())
+    return sha1.hexdigest()
+
+
+def is_current(run, method, refs_folder, offset):
+    """Whether the partition of a run and method exists and was built with
+    the given offset from the results and references as they are now.
+    """
+    meta_path = os.path.join(partition_folder(run, method), 'meta.json')
+    try:
+        with open(meta_path) as meta_file:
+            meta = json.load(meta_file)
+    except FileNotFoundError:
+        return False
+    manifest = registry.load_manifest('results', run)
+    refs = _refs(manifest, method, refs_folder)
+    return (meta['offset'] == offset and
+            meta['refs_folder'] == os.path.abspath(refs_folder) and
+            meta.get('sources') == _sources(manifest, method, refs_folder,
+                                            refs))
+
+
+def build_partition(run, method, refs_folder, offset):
+    """Write the frames of a registered results run for one method.
+
+    Estimates are aligned to every reference frame with the given offset, as
+    in scoring.load_aligned(). References without a result in the run (e.g.
+    runs on the 1/5 dataset) are left out. The meta of the partition records
+    a fingerprint of its sources, see is_current().
+    """
+    manifest = registry.load_manifest('results', run)
+    refs = _refs(manifest, method, refs_folder)
+
+    values = {name: [] for name in columns}
+    for file_index, ref in enumerate(refs):
+        ref_values, estimated_values = scoring.load_aligned(
+            os.path.join(refs_folder, ref),
+            os.path.join(manifest['folder'],
+                         scoring.result_filename(ref, method)),
+            offset)
+        values['file'].append(np.full(len(ref_values), file_index, np.int32))
+        values['time'].append(
+            scoring.ref_times(len(ref_values)).astype(np.int32))
+        values['ref_f0'].append(ref_values)
+        values['estimated_f0'].append(estimated_values)
+        values['ref_voiced'].append(ref_values != 0.0)
+        values['estimated_voiced'].append(estimated_values != 0.0)
+
+    meta = {
+        'run': run,
+        'method': method,
+        'offset': offset,
+        'corpus': manifest.get('corpus'),
+        'settings': manifest['settings'],
+        'refs_folder': os.path.abspath(refs_folder),
+        'files': refs,
+        'sources': _sources(manifest, method, refs_folder, refs),
+        'n_frames': int(sum(len(time) for time in values['time']))
+    }
+
+    # written aside then moved in place, so that a partition is never seen
+    # half written
+    folder = partition_folder(run, method)
+    os.makedirs(os.path.dirname(folder), exist_ok=True)
+    tmp_folder = tempfile.mkdtemp(dir=os.path.dirname(folder),
+                                  suffix='.tmp')
+    for name in columns:
+        column = (np.concatenate(values[name]) if values[name]
+                  else np.zeros(0))
+        np.save(os.path.join(tmp_folder, name + '.npy'), column)
+    with open(os.path.join(tmp_folder, 'meta.json'), 'w') as meta_file:
+        json.dump(meta, meta_file, indent=1, sort_keys=True)
+    # the previous partition is moved aside, then the new one moved in: a
+    # reader opening the partition between the two renames finds it missing,
+    # while columns already mapped from the previous one stay readable after
+    # it is removed
+    old_folder = None
+    if os.path.isdir(folder):
+        old_folder = tempfile.mkdtemp(dir=os.path.dirname(folder),
+                                      suffix='.tmp')
+        os.rename(folder, os.path.join(old_folder, method))
+    os.rename(tmp_folder, folder)
+    if old_folder is not None:
+        shutil.rmtree(old_folder)
+    return meta
+
+
+def update_catalog():
+    catalog = []
+    for run in sorted(os.listdir(warehouse_folder)):
+        run_folder = os.path.join(warehouse_folder, run)
+        if not os.path.isdir(run_folder) or run.endswith('.tmp'):
+            continue
+        for method in sorted(os.listdir(run_folder)):
+            # partitions being written or replaced
+            if method.endswith('.tmp'):
+                continue
+            meta_path = os.path.join(run_folder, method, 'meta.json')
+            if os.path.isfile(meta_path):
+                with open(meta_path) as meta_file:
+                    catalog.append(json.load(meta_file))
+
+    fd, tmp_path = tempfile.mkstemp(dir=warehouse_folder, suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp_file:
+        json.dump(catalog, tmp_file)
+    os.replace(tmp_path, os.path.join(warehouse_folder, catalog_filename))
+    load_catalog.cache_clear()
+
+
+@functools.lru_cache(maxsize=1)
+def load_catalog():
+    catalog_path = os.path.join(warehouse_folder, catalog_filename)
+    with open(catalog_path) as catalog_file:
+        return json.load(catalog_file)
+
+
+def field(meta, name):
+    # run, corpus, method and offset of a partition, or one of its settings
+    # (None if not set, e.g. snr for the original audio)
+    if name in ('run', 'corpus', 'method', 'offset', 'settings'):
+        return meta[name]
+    return meta['settings'].get(name)
+
+
+def _matches(meta, where):
+    for name, wanted in where.items():
+        value = field(meta, name)
+        if isinstance(wanted, (list, tuple, set)):
+            if value not in wanted:
+                return False
+        elif value != wanted:
+            return False
+    return True
+
+
+def partitions(**where):
+    """Meta of the partitions matching every condition of where.
+
+    Conditions are on run, corpus, method, offset or a setting, e.g.
+    method='yin', noise='babble', snr=[5, 0]; settings={} selects the
+    original audio.
+    """
+    return [meta for meta in load_catalog() if _matches(meta, where)]
+
+
+def load_columns(meta, names=columns, mmap_mode='r'):
+    folder = partition_folder(meta['run'], meta['method'])
+    return {name: np.load(os.path.join(folder, name + '.npy'),
+                          mmap_mode=mmap_mode)
+            for name in names}
+
+
+def error_counts(by, max_freq_deviation_percentage, **where):
+    """Counts of scoring.score() summed over the frames of each group.
+
+    by lists the fields (see field()) the selected partitions are grouped
+    by; the result maps each tuple of their values to a dict of counts.
+    """
+    groups = {}
+    for meta in partitions(**where):
+        frames = load_columns(meta, ['ref_f0', 'estimated_f0'])
+        counts = scoring.score(frames['ref_f0'], frames['estimated_f0'],
+                               max_freq_deviation_percentage)
+        group = tuple(field(meta, name) for name in by)
+        groups[group] = groups.get(group, 0) + counts
+    return {group: scoring.totals(counts) for group, counts in groups.items()}
+
+
+def error_rate(max_freq_deviation_percentage, **where):
+    # error rate over all the frames of the selected partitions
+    counts = error_counts([], max_freq_deviation_percentage, **where)
+    if not counts:
+        raise KeyError('no partition matches ' + repr(where))
+    counts = counts[()]
+    return counts['n_errors'] / counts['n_values']